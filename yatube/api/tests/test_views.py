@@ -0,0 +1,103 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}', group=self.group
+            )
+            for i in range(15)
+        ]
+        self.post = self.posts[-1]
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+
+    def test_feeds_are_paginated_by_cursor(self):
+        """Ленты отдают JSON страницами по курсору."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': 'test'}),
+            reverse('api:profile', kwargs={'username': 'testAuthor'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(len(data['results']), 10)
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'created': data['results'][0]['created'],
+                    'author': 'testAuthor',
+                    'group': 'test',
+                    'image': None,
+                    'comments_count': 1,
+                })
+                self.assertIsNone(data['previous'])
+                data = self.guest_client.get(data['next']).json()
+                self.assertEqual(len(data['results']), 5)
+                self.assertIsNone(data['next'])
+
+    def test_post_detail_with_comments(self):
+        """Запись отдается вместе с комментариями."""
+        data = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(data['post']['id'], self.post.pk)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Комментарий']
+        )
+        response = self.guest_client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_image_url_comes_from_field_storage(self):
+        """Адрес картинки строит хранилище поля image."""
+        Post.objects.filter(pk=self.post.pk).update(image='posts/ab/ab.jpg')
+        cache.clear()
+        storage = FileSystemStorage(base_url='/images/')
+        field = Post._meta.get_field('image')
+        with mock.patch.object(field, 'storage', storage):
+            data = self.guest_client.get(
+                reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+            ).json()
+        self.assertEqual(data['post']['image'], '/images/posts/ab/ab.jpg')
+
+    def test_repeat_poll_gets_not_modified(self):
+        """Повторный опрос с ETag получает 304 без запросов к базе,
+        а новый комментарий меняет ETag."""
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Еще комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
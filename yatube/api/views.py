@@ -0,0 +1,142 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import require_safe
+
+from posts import resolvers
+from posts.cache import feed_data
+from posts.models import Comment, Post
+from posts.paginators import ValuesCursorPaginator
+
+API_VERSION = 'v1'
+
+POST_FIELDS = (
+    'id', 'text', 'created', 'image', 'comments_count',
+    'author__username', 'group__slug',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+
+def image_url(name):
+    """Адрес картинки записи в хранилище ее поля."""
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+def post_row(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': image_url(row['image']),
+        'comments_count': row['comments_count'],
+    }
+
+
+def comment_row(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def page_data(request, rows, cursor, serialize):
+    """Страница строк ``values()`` по курсору со ссылками на соседние."""
+    page = ValuesCursorPaginator(
+        rows, settings.POSTS_PER_PAGE
+    ).cursor_page(cursor)
+    links = {}
+    for name, token in (
+        ('next', page.next_cursor), ('previous', page.previous_cursor)
+    ):
+        links[name] = (
+            f'{request.path}?{urlencode({"cursor": token})}'
+            if token else None
+        )
+    return {'results': [serialize(row) for row in page], **links}
+
+
+def json_response(request, feed, build):
+    """JSON ленты с сильным ETag.
+
+    Тело и его хеш кешируются до смены версии ленты, поэтому
+    повторный опрос с If-None-Match получает 304 без выборки
+    и сериализации.
+    """
+    cursor = request.GET.get('cursor')
+
+    def render():
+        body = json.dumps(
+            {'version': API_VERSION, **build(cursor)},
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+            separators=(',', ':'),
+        ).encode()
+        return f'"{hashlib.md5(body).hexdigest()}"', body
+
+    key = hashlib.md5(f'{request.path}:{cursor}'.encode()).hexdigest()
+    etag, body = feed_data(feed, f'api:{API_VERSION}:{key}', render)
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def posts_data(request, post_list):
+    def build(cursor):
+        return page_data(
+            request,
+            post_list.values(*POST_FIELDS),
+            cursor,
+            post_row,
+        )
+    return build
+
+
+@require_safe
+def index(request):
+    return json_response(request, 'index', posts_data(
+        request, Post.objects.all()
+    ))
+
+
+@require_safe
+def group_posts(request, slug):
+    group = resolvers.groups.get_or_404(slug)
+    return json_response(request, f'group:{group.pk}', posts_data(
+        request, group.posts.all()
+    ))
+
+
+@require_safe
+def profile(request, username):
+    author = resolvers.users.get_or_404(username)
+    return json_response(request, f'profile:{author.pk}', posts_data(
+        request, author.posts.all()
+    ))
+
+
+@require_safe
+def post_detail(request, post_id):
+    def build(cursor):
+        post = Post.objects.filter(pk=post_id).values(*POST_FIELDS).first()
+        if post is None:
+            raise Http404
+        comments = page_data(
+            request,
+            Comment.objects.filter(post_id=post_id).values(*COMMENT_FIELDS),
+            cursor,
+            comment_row,
+        )
+        return {'post': post_row(post), 'comments': comments}
+    return json_response(request, f'post:{post_id}', build)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import configure_sqlite, pin_primary_for_migrations
+
+        connection_created.connect(configure_sqlite)
+        pre_migrate.connect(pin_primary_for_migrations)
@@ -0,0 +1,117 @@
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Применяет PRAGMA из SQLITE_PRAGMAS к новому соединению SQLite.
+
+    Значения для отдельной базы можно переопределить ключом PRAGMAS
+    в ее настройках в DATABASES. busy_timeout ставится первым, а режим
+    журнала меняется, только если отличается: смена требует
+    монопольной блокировки, а WAL сохраняется в файле базы.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = {
+        **settings.SQLITE_PRAGMAS,
+        **connection.settings_dict.get('PRAGMAS', {}),
+    }
+    database = connection.connection
+    if 'busy_timeout' in pragmas:
+        database.execute(f'PRAGMA busy_timeout = {pragmas["busy_timeout"]}')
+    journal_mode = pragmas.pop('journal_mode', None)
+    if journal_mode is not None:
+        current, = database.execute('PRAGMA journal_mode').fetchone()
+        if current.lower() != str(journal_mode).lower():
+            database.execute(f'PRAGMA journal_mode = {journal_mode}')
+    for name, value in pragmas.items():
+        database.execute(f'PRAGMA {name} = {value}')
+
+
+_state = threading.local()
+
+
+def pin_primary():
+    """Направляет чтения текущего потока на основную базу."""
+    _state.primary = True
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут на основную базу.
+
+    Нужно там, где прочитанное кешируется под уже измененной версией:
+    отстающая реплика закешировала бы старые данные как новые.
+    """
+    previous = reads_from_primary()
+    pin_primary()
+    try:
+        yield
+    finally:
+        _state.primary = previous or wrote()
+
+
+def pin_primary_for_migrations(sender, **kwargs):
+    """Данные в миграциях читаются с основной базы, а не с реплики."""
+    pin_primary()
+
+
+def reset():
+    _state.primary = False
+    _state.wrote = False
+
+
+def reads_from_primary():
+    return getattr(_state, 'primary', False)
+
+
+def wrote():
+    """Была ли запись в базу с последнего reset()."""
+    return getattr(_state, 'wrote', False)
+
+
+class PrimaryReplicaRouter:
+    """Чтения идут на случайную базу из DATABASE_REPLICAS, запись на
+    основную. После первой записи чтения потока тоже идут на основную
+    базу, чтобы автор сразу видел свои изменения."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or reads_from_primary():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+def copy_database(source, target):
+    """Копирует базу SQLite ``source`` в ``target`` через backup API.
+
+    Копия согласованна, даже если в основную базу в это время пишут,
+    а читатели реплики ждут окончания копирования по busy_timeout.
+    """
+    source = sqlite3.connect(source)
+    target = sqlite3.connect(target)
+    try:
+        target.execute(
+            f'PRAGMA busy_timeout = '
+            f'{settings.SQLITE_PRAGMAS.get("busy_timeout", 5000)}'
+        )
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
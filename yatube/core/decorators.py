@@ -0,0 +1,93 @@
+import hashlib
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class QueryBudgetExceeded(Exception):
+    """View выполнила больше SQL-запросов, чем заявлено."""
+
+
+class QueryCounter:
+    """Обертка для ``connection.execute_wrapper``, считающая запросы."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def query_budget(limit):
+    """Заявляет максимальное число SQL-запросов view-функции.
+
+    Проверка включается настройкой QUERY_BUDGET_CHECK: при превышении
+    бюджета выбрасывается QueryBudgetExceeded. Считаются запросы ко всем
+    базам, включая реплики. Бюджет не зависит от числа постов
+    на странице, поэтому N+1 сразу роняет тесты.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'QUERY_BUDGET_CHECK', False):
+                return view(request, *args, **kwargs)
+            counter = QueryCounter()
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(counter)
+                    )
+                response = view(request, *args, **kwargs)
+            if counter.count > limit:
+                raise QueryBudgetExceeded(
+                    f'{view.__name__}: {counter.count} запросов '
+                    f'при бюджете {limit}'
+                )
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+def conditional_page(state):
+    """Отвечает 304 на повторный запрос неизмененной страницы.
+
+    ``state(request, *args, **kwargs)`` одним запросом возвращает пару
+    (время последнего изменения, отпечаток содержимого) или None, если
+    страницы нет. Из пары строятся Last-Modified и ETag, отпечаток
+    ловит то, чего не видно по времени, например удаление записи.
+    Страницы вошедших пользователей содержат персональные части
+    и не кешируются.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            current = state(request, *args, **kwargs)
+            if current is None or current[0] is None:
+                return view(request, *args, **kwargs)
+            last_modified, fingerprint = current
+            etag = quote_etag(hashlib.md5(
+                f'{request.get_full_path()}:{last_modified.isoformat()}:'
+                f'{fingerprint}'.encode()
+            ).hexdigest())
+            timestamp = int(last_modified.timestamp())
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+            return response
+        return wrapper
+    return decorator
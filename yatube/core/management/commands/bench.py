@@ -0,0 +1,163 @@
+import json
+import math
+import time
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.decorators import QueryCounter
+from posts.models import Post
+
+User = get_user_model()
+
+APPS = ('posts', 'users', 'about')
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def routes(arguments):
+    """Все маршруты APPS с подставленными аргументами."""
+    for app in APPS:
+        module = import_module(f'{app}.urls')
+        for pattern in module.urlpatterns:
+            name = f'{module.app_name}:{pattern.name}'
+            kwargs = {
+                key: arguments[key] for key in pattern.pattern.converters
+            }
+            yield name, reverse(name, kwargs=kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты posts, users и about через тестовый '
+        'клиент и выводит JSON с перцентилями задержки, числом '
+        'SQL-запросов и размером ответа. Изменения в базе, сделанные '
+        'запросами, откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько замеров на маршрут.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Сколько запросов сделать до замеров.',
+        )
+        parser.add_argument(
+            '--username',
+            help='Под кем открывать страницы, требующие входа. '
+                 'По умолчанию пользователь с наибольшим числом подписок.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона: для каждого маршрута добавится '
+                 'отношение p95 к прошлому.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Куда записать JSON. По умолчанию в stdout.',
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        client = Client(HTTP_HOST='localhost')
+        results = {}
+        for name, url in routes(self.arguments(user)):
+            with transaction.atomic():
+                results[name] = self.measure(
+                    client, user, url,
+                    options['warmup'], options['requests'],
+                )
+                transaction.set_rollback(True)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                self.compare(results, json.load(baseline)['routes'])
+        report = json.dumps({
+            'requests': options['requests'],
+            'username': user.username,
+            'routes': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+    def get_user(self, username):
+        users = User.objects.select_related('stats')
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.order_by('-stats__following_count').first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей: заполните базу командой seed_benchmark.'
+            )
+        return user
+
+    def arguments(self, user):
+        """Значения аргументов маршрутов на данных из базы."""
+        author = User.objects.order_by('-stats__posts_count').first()
+        post = author.posts.order_by('-comments_count').first()
+        group = Post.objects.exclude(group=None).values_list(
+            'group__slug', flat=True
+        ).first()
+        if post is None or group is None:
+            raise CommandError(
+                'Нет записей с группой: заполните базу командой '
+                'seed_benchmark.'
+            )
+        return {
+            'slug': group,
+            'username': author.username,
+            'post_id': post.pk,
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        }
+
+    def measure(self, client, user, url, warmup, requests):
+        timings, queries = [], []
+        for number in range(warmup + requests):
+            client.force_login(user)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - start
+            if number >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(counter.count)
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'queries': max(queries),
+            'bytes': len(response.content),
+        }
+
+    def compare(self, results, baseline):
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous and previous['p95_ms']:
+                result['p95_ratio'] = round(
+                    result['p95_ms'] / previous['p95_ms'], 3
+                )
@@ -0,0 +1,163 @@
+import json
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .bench import percentile
+
+# Настройки SQLite по умолчанию для сравнения: журнал отката вместо WAL.
+BASELINE_PRAGMAS = {'journal_mode': 'delete'}
+
+# Кеш страниц отключен, чтобы каждое чтение доходило до базы.
+NO_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}}
+
+
+def read(urls, deadline, results):
+    """Процесс-читатель: по кругу открывает ленты гостем."""
+    client = Client(HTTP_HOST='localhost')
+    timings, errors = [], 0
+    while time.monotonic() < deadline:
+        for url in urls:
+            start = time.perf_counter()
+            try:
+                status = client.get(url).status_code
+            except OperationalError:
+                status = None
+            if status == 200:
+                timings.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+    results.put({'timings': timings, 'errors': errors})
+
+
+def write(author, interval, deadline, results):
+    """Процесс-писатель: создает записи от имени автора."""
+    created, errors = [], 0
+    while time.monotonic() < deadline:
+        try:
+            post = Post.objects.create(
+                author=author, text='Нагрузочная запись'
+            )
+        except OperationalError:
+            errors += 1
+        else:
+            created.append(post.pk)
+        time.sleep(interval)
+    results.put({'created': created, 'errors': errors})
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пропускную способность чтения лент, пока отдельный '
+        'процесс непрерывно создает записи. Каждый читатель и писатель '
+        'работает в своем процессе со своим соединением, как воркеры '
+        'WSGI-сервера. Кеш страниц отключается, созданные записи '
+        'удаляются после замера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=4,
+            help='Сколько процессов читают ленты.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Длительность замера, секунды.',
+        )
+        parser.add_argument(
+            '--write-interval',
+            type=float,
+            default=0.01,
+            help='Пауза между записями писателя, секунды.',
+        )
+        parser.add_argument(
+            '--baseline',
+            action='store_true',
+            help='Замерить без WAL и настроек SQLITE_PRAGMAS.',
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.exclude(group=None).select_related(
+            'author', 'group'
+        ).first()
+        if post is None:
+            raise CommandError(
+                'Нет записей с группой: заполните базу командой '
+                'seed_benchmark.'
+            )
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': post.group.slug}),
+            reverse(
+                'posts:profile', kwargs={'username': post.author.username}
+            ),
+        )
+        overrides = {'CACHES': NO_CACHE}
+        if options['baseline']:
+            overrides['SQLITE_PRAGMAS'] = BASELINE_PRAGMAS
+        with override_settings(**overrides):
+            # Режим журнала меняется только без других открытых
+            # соединений, а дочерние процессы открывают свои.
+            connections.close_all()
+            journal_mode = self.journal_mode()
+            connections.close_all()
+            reads, writes = self.run(urls, post.author, options)
+        Post.objects.filter(pk__in=writes['created']).delete()
+        timings = reads['timings']
+        duration = options['duration']
+        self.stdout.write(json.dumps({
+            'journal_mode': journal_mode,
+            'readers': options['readers'],
+            'duration_s': duration,
+            'reads': len(timings),
+            'reads_per_s': round(len(timings) / duration, 1),
+            'read_p95_ms': (
+                round(percentile(timings, 95), 3) if timings else None
+            ),
+            'writes': len(writes['created']),
+            'writes_per_s': round(len(writes['created']) / duration, 1),
+            'read_errors': reads['errors'],
+            'write_errors': writes['errors'],
+        }, ensure_ascii=False, indent=2))
+
+    def journal_mode(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            return cursor.fetchone()[0]
+
+    def run(self, urls, author, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            context.Process(target=read, args=(urls, deadline, results))
+            for _ in range(options['readers'])
+        ]
+        workers.append(context.Process(target=write, args=(
+            author, options['write_interval'], deadline, results
+        )))
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        reads = {'timings': [], 'errors': 0}
+        for result in collected:
+            if 'created' in result:
+                writes = result
+            else:
+                reads['timings'] += result['timings']
+                reads['errors'] += result['errors']
+        return reads, writes
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import copy_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite во все базы из DATABASE_REPLICAS. '
+        'С --interval повторяет копирование, пока его не остановят: '
+        'так локально эмулируется репликация.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Пауза между копированиями, секунды. Без нее копирует '
+                 'один раз.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_REPLICA=1 '
+                'или DATABASE_REPLICAS.'
+            )
+        databases = [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]
+        for alias in databases:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(
+                    f'База {alias} не SQLite: используйте репликацию СУБД.'
+                )
+        source = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        while True:
+            start = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                copy_database(
+                    source, connections[alias].settings_dict['NAME']
+                )
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.perf_counter() - start) * 1000:.0f} мс.'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,208 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+from django.template.base import Template
+
+from . import db
+
+logger = logging.getLogger('core.performance')
+
+_local = threading.local()
+_instrumented = set()
+MISSING = object()
+
+
+class RequestMetrics:
+    """Счетчики одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.templates = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self):
+        return ', '.join((
+            f'sql;dur={self.sql * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.templates * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={self.total * 1000:.1f}',
+        ))
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql * 1000, 3),
+            'template_ms': round(self.templates * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'total_ms': round(self.total * 1000, 3),
+        }
+
+
+def _metrics():
+    return getattr(_local, 'metrics', None)
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        metrics = _metrics()
+        if metrics is None:
+            return render(self, context)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.templates += time.perf_counter() - start
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        metrics = _metrics()
+        if metrics is None:
+            return get(self, key, default, version)
+        value = get(self, key, MISSING, version)
+        if value is MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        found = get_many(self, keys, version)
+        metrics = _metrics()
+        if metrics is not None:
+            keys = list(keys)
+            metrics.cache_hits += len(found)
+            metrics.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def instrument():
+    """Один раз оборачивает рендер шаблонов и чтение кешей из CACHES.
+
+    Базовый get_many читает через get, поэтому оборачивается только
+    собственный get_many бэкенда. Обертки считают только внутри
+    запроса, попавшего в выборку.
+    """
+    targets = [(Template, 'render', _timed_render)]
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        targets.append((backend, 'get', _counted_get))
+        if backend.get_many is not BaseCache.get_many:
+            targets.append((backend, 'get_many', _counted_get_many))
+    for cls, name, wrap in targets:
+        if (cls, name) not in _instrumented:
+            _instrumented.add((cls, name))
+            setattr(cls, name, wrap(getattr(cls, name)))
+
+
+class PerformanceMiddleware:
+    """Замеряет запросы: число и время SQL, рендер шаблонов, попадания
+    в кеш и общее время.
+
+    Доля замеряемых запросов задается PERFORMANCE_SAMPLE_RATE (от 0
+    до 1). Замеры отдаются заголовком Server-Timing и строкой JSON
+    в логгер ``core.performance``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 0)
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.total = time.perf_counter() - start
+            _local.metrics = None
+        response['Server-Timing'] = metrics.server_timing()
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }, ensure_ascii=False))
+        return response
+
+
+class PrimaryReplicaMiddleware:
+    """Закрепляет чтения за основной базой там, где реплика может
+    отставать.
+
+    Небезопасные запросы (POST и другие) читают только основную базу.
+    Если запрос что-то записал, ответ ставит cookie на
+    REPLICA_STICKY_SECONDS секунд, и следующие запросы пользователя,
+    например, редирект на профиль после публикации, тоже читают
+    основную базу, пока реплику не догонит копирование.
+    """
+
+    cookie = 'primary_reads'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db.reset()
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') or (
+            self.cookie in request.COOKIES
+        ):
+            db.pin_primary()
+        try:
+            response = self.get_response(request)
+            if db.wrote() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    self.cookie,
+                    '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+            return response
+        finally:
+            db.reset()
@@ -1,7 +1,26 @@
+import json
+import os
+import sqlite3
+import tempfile
 from http import HTTPStatus
+from io import StringIO
 
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.urls import resolve, reverse
+
+from posts.cache import feed_data
+from posts.models import Post
+
+from . import db
+from .decorators import QueryBudgetExceeded
+from .middleware import PrimaryReplicaMiddleware
 
 User = get_user_model()
 
@@ -16,3 +35,193 @@ class ViewTestClass(TestCase):
     def assertions(self, response):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class QueryBudgetMixin:
+    """Проверка заявленного через @query_budget числа запросов view."""
+
+    def assertWithinQueryBudget(self, client, url):
+        view = resolve(url.split('?')[0]).func
+        self.assertTrue(
+            hasattr(view, 'query_budget'),
+            f'Для {url} не заявлен бюджет запросов'
+        )
+        with override_settings(QUERY_BUDGET_CHECK=True):
+            try:
+                response = client.get(url)
+            except QueryBudgetExceeded as error:
+                self.fail(str(error))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response
+
+
+class BenchCommandTest(TestCase):
+    def test_bench_reports_every_route(self):
+        """Бенчмарк проходит все маршруты на засеянной базе
+        и не оставляет изменений."""
+        call_command(
+            'seed_benchmark', users=5, groups=2, posts=30, comments=60,
+            follows=10, stdout=StringIO(),
+        )
+        follows = User.objects.get(username='bench0').follower.count()
+        output = StringIO()
+        call_command('bench', requests=2, warmup=0, stdout=output)
+        routes = json.loads(output.getvalue())['routes']
+        self.assertEqual(routes['posts:index']['url'], reverse('posts:index'))
+        self.assertIn('about:tech', routes)
+        self.assertIn('users:password_reset_confirm', routes)
+        for name, route in routes.items():
+            with self.subTest(route=name):
+                self.assertLess(route['status'], HTTPStatus.BAD_REQUEST)
+                self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+        self.assertEqual(
+            User.objects.get(username='bench0').follower.count(), follows
+        )
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        self.guest_client = Client()
+        self.author = User.objects.create_user(username='testAuthor')
+        Post.objects.create(author=self.author, text='Тестовый пост')
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_sampled_request_reports_timings(self):
+        """Замеренный запрос отдает Server-Timing и строку лога."""
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['sql_ms'])
+        self.assertEqual(record['cache_misses'], 1)
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+            self.guest_client.get(reverse('posts:index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertGreater(record['cache_hits'], 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        """Запрос вне выборки не получает заголовка."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class SqlitePragmasTest(TestCase):
+    def pragmas(self, settings_dict=None):
+        """Значения PRAGMA нового соединения к тестовой базе."""
+        copy = connection.copy()
+        copy.settings_dict.update(settings_dict or {})
+        try:
+            with copy.cursor() as cursor:
+                values = {}
+                for name in ('busy_timeout', 'cache_size', 'synchronous'):
+                    cursor.execute(f'PRAGMA {name}')
+                    values[name] = cursor.fetchone()[0]
+                return values
+        finally:
+            copy.close()
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -4000,
+        'busy_timeout': 1234,
+    })
+    def test_new_connection_is_configured(self):
+        """Каждое новое соединение получает PRAGMA из настроек,
+        PRAGMAS базы их переопределяют."""
+        self.assertEqual(self.pragmas(), {
+            'busy_timeout': 1234, 'cache_size': -4000, 'synchronous': 1,
+        })
+        self.assertEqual(
+            self.pragmas({'PRAGMAS': {'busy_timeout': 10}})['busy_timeout'],
+            10,
+        )
+
+
+class BenchConcurrencyCommandTest(TestCase):
+    def test_requires_seeded_database(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_concurrency', duration=0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaTest(SimpleTestCase):
+    def setUp(self):
+        self.router = db.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.addCleanup(db.reset)
+
+    def route(self, request, write=False):
+        """Базы чтения до и после view и ответ middleware."""
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+        response = PrimaryReplicaMiddleware(view)(request)
+        return reads, response
+
+    def test_reads_go_to_replica(self):
+        reads, response = self.route(self.factory.get('/'))
+        self.assertEqual(reads, ['replica', 'replica'])
+        self.assertNotIn(PrimaryReplicaMiddleware.cookie, response.cookies)
+
+    def test_reads_after_write_stick_to_primary(self):
+        """После записи чтения запроса и следующих запросов
+        пользователя идут на основную базу."""
+        reads, response = self.route(self.factory.get('/'), write=True)
+        self.assertEqual(reads, ['replica', 'default'])
+        cookie = response.cookies[PrimaryReplicaMiddleware.cookie]
+        request = self.factory.get('/')
+        request.COOKIES[cookie.key] = cookie.value
+        reads, _ = self.route(request)
+        self.assertEqual(reads, ['default', 'default'])
+
+    def test_unsafe_requests_read_primary(self):
+        reads, _ = self.route(self.factory.post('/'))
+        self.assertEqual(reads, ['default', 'default'])
+
+    def test_cache_misses_read_primary(self):
+        """Промах кеша лент читает с основной базы, чтобы отстающая
+        реплика не попала в кеш под новой версией."""
+        reads = []
+        feed_data('test', 'reads', lambda: reads.append(
+            self.router.db_for_read(Post)
+        ))
+        reads.append(self.router.db_for_read(Post))
+        self.assertEqual(reads, ['default', 'replica'])
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        reads, response = self.route(self.factory.get('/'), write=True)
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertNotIn(PrimaryReplicaMiddleware.cookie, response.cookies)
+
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'source.sqlite3')
+            target = os.path.join(directory, 'target.sqlite3')
+            with sqlite3.connect(source) as database:
+                database.execute('CREATE TABLE item (name TEXT)')
+                database.execute("INSERT INTO item VALUES ('копия')")
+            database.close()
+            db.copy_database(source, target)
+            database = sqlite3.connect(target)
+            self.assertEqual(
+                database.execute('SELECT name FROM item').fetchall(),
+                [('копия',)],
+            )
+            database.close()
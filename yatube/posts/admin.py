@@ -1,6 +1,9 @@
 from django.contrib import admin
 
+from .export import EXPORT_ACTIONS
 from .models import Comment, Follow, Group, Post
+from .paginators import CachedCountPaginator
+from .search import filter_posts
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -23,9 +26,15 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('created',)
     empty_value_display = '-пусто-'
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    actions = EXPORT_ACTIONS
 
     def count_comments(self, object):
-        return object.comments.count()
+        return object.comments_count
+
+    def get_search_results(self, request, queryset, search_term):
+        return filter_posts(queryset, search_term), False
 
 
 class CommentAdmin(admin.ModelAdmin):
@@ -38,6 +47,9 @@ class CommentAdmin(admin.ModelAdmin):
     )
     search_fields = ('text',)
     list_filter = ('created', 'author',)
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    actions = EXPORT_ACTIONS
 
 
 class FollowAdmin(admin.ModelAdmin):
@@ -48,6 +60,7 @@ class FollowAdmin(admin.ModelAdmin):
     )
     search_fields = ('user', 'author',)
     list_filter = ('user', 'author',)
+    actions = EXPORT_ACTIONS
 
 
 admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,62 @@
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import connection
+
+from . import feeds, search
+from .counters import reconcile_images, reconcile_posts, reconcile_users
+
+
+def insert_rows(model, fields, rows, batch_size=None):
+    """Вставляет кортежи значений полей ``fields`` через executemany.
+
+    В отличие от bulk_create значения не проходят подготовку полей
+    и сигналы, поэтому даты приводятся к формату базы здесь, а
+    auto_now и значения по умолчанию не применяются.
+    """
+    fields = [model._meta.get_field(name) for name in fields]
+    dates = [
+        index for index, field in enumerate(fields)
+        if field.get_internal_type() == 'DateTimeField'
+    ]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, batch_size or 10_000))
+            if not batch:
+                return
+            if dates:
+                batch = [list(row) for row in batch]
+                for row in batch:
+                    for index in dates:
+                        row[index] = adapt(row[index])
+            cursor.executemany(sql, batch)
+
+
+def rebuild_derived(batch_size, log=None):
+    """Пересобирает данные, которые ведут сигналы: счетчики, ссылки
+    на картинки, ленты подписок, поисковый индекс и кеш страниц.
+
+    Нужна после bulk_create и insert_rows: они сигналы не вызывают.
+    """
+    steps = (
+        ('Пересчет счетчиков', lambda: (
+            reconcile_posts(batch_size),
+            reconcile_users(batch_size),
+            reconcile_images(),
+        )),
+        ('Раскладка лент подписок', feeds.backfill_all),
+        ('Построение поискового индекса', lambda: search.rebuild(batch_size)),
+        ('Очистка кеша', cache.clear),
+    )
+    for title, step in steps:
+        if log:
+            log(f'{title}...')
+        step()
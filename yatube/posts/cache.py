@@ -0,0 +1,102 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import transaction
+
+from core.db import primary_reads
+
+
+# Версия названий групп и имен пользователей, которые видны рядом
+# с записями на любой странице.
+NAMES_FEED = 'names'
+
+
+def post_feeds(post, group_id=None):
+    """Ленты, в которых показывается пост."""
+    feeds = {'index', f'profile:{post.author_id}', f'post:{post.pk}'}
+    for group in (post.group_id, group_id):
+        if group is not None:
+            feeds.add(f'group:{group}')
+    return feeds
+
+
+def _version_key(feed):
+    return f'feed:{feed}:version'
+
+
+def version(feed):
+    """Текущая версия ленты; меняется при любой правке ее постов."""
+    key = _version_key(feed)
+    value = cache.get(key)
+    if value is None:
+        value = time.time_ns()
+        cache.add(key, value, None)
+        value = cache.get(key, value)
+    return value
+
+
+def _bump(feeds):
+    for feed in feeds:
+        try:
+            cache.incr(_version_key(feed))
+        except ValueError:
+            cache.set(_version_key(feed), time.time_ns(), None)
+
+
+def bump(feeds):
+    """Инвалидирует все закешированные страницы лент.
+
+    Версии меняются сразу и еще раз после коммита, чтобы страница,
+    прочитанная параллельным запросом до коммита, не осталась в кеше.
+    """
+    feeds = tuple(feeds)
+    _bump(feeds)
+    transaction.on_commit(lambda: _bump(feeds))
+
+
+def cached_count(feed, queryset):
+    """COUNT(*) для queryset, закешированный до смены версии ленты."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    digest = hashlib.md5(f'{sql}:{params}'.encode()).hexdigest()
+    key = f'feed:{feed}:{version(feed)}:count:{digest}'
+    count = cache.get(key)
+    if count is None:
+        with primary_reads():
+            count = queryset.count()
+        cache.set(key, count, settings.FEED_CACHE_TIMEOUT)
+    return count
+
+
+def feed_page(feed, paginator, cursor=None, number=None):
+    """Страница ленты из кеша, ключ зависит от версии ленты
+    и запрошенного курсора или номера страницы."""
+    position = hashlib.md5(f'{cursor}:{number}'.encode()).hexdigest()
+    key = f'feed:{feed}:{version(feed)}:{position}'
+    state = cache.get(key)
+    if state is not None:
+        return paginator.load(state)
+    with primary_reads():
+        page = paginator.cursor_page(cursor, number)
+    cache.set(key, paginator.dump(page), settings.FEED_CACHE_TIMEOUT)
+    return page
+
+
+def feed_data(feed, name, build):
+    """Результат ``build()`` из кеша до смены версии ленты.
+
+    Как и все промахи кеша лент, ``build()`` читает с основной базы:
+    версия уже сменилась, а реплика может еще отдавать старые строки.
+    """
+    key = f'feed:{feed}:{version(feed)}:data:{name}'
+    data = cache.get(key)
+    if data is None:
+        with primary_reads():
+            data = build()
+        cache.set(key, data, settings.FEED_CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,162 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import thumbnails
+from .models import Comment, Follow, Post, StoredImage, User, UserStats
+
+USER_COUNTERS = ('posts_count', 'followers_count', 'following_count')
+
+
+def _guard(field, delta):
+    """Условие, не дающее счетчику уйти ниже нуля."""
+    return {f'{field}__gte': -delta} if delta < 0 else {}
+
+
+def change_user_counter(user_id, field, delta):
+    """Атомарно меняет счетчик пользователя.
+
+    Строка счетчиков создается только при увеличении: уменьшение
+    приходит и при каскадном удалении самого пользователя.
+    """
+    stats = UserStats.objects.filter(user_id=user_id, **_guard(field, delta))
+    changes = {field: F(field) + delta}
+    if not stats.update(**changes) and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        stats.update(**changes)
+
+
+def change_comments_count(post_id, delta):
+    """Меняет счетчик комментариев и дату изменения записи: от нее
+    считается Last-Modified страниц с этой записью."""
+    Post.objects.filter(
+        pk=post_id, **_guard('comments_count', delta)
+    ).update(
+        comments_count=F('comments_count') + delta,
+        updated=timezone.now(),
+    )
+
+
+def change_image_references(name, delta):
+    """Меняет число записей, ссылающихся на файл картинки.
+
+    Когда ссылок не остается, файл и его миниатюры удаляются после
+    коммита, если к тому времени на него снова никто не сослался.
+    """
+    if not name:
+        return
+    images = StoredImage.objects.filter(
+        name=name, **_guard('references', delta)
+    )
+    changes = {'references': F('references') + delta}
+    if not images.update(**changes) and delta > 0:
+        StoredImage.objects.get_or_create(name=name)
+        images.update(**changes)
+    if delta < 0:
+        transaction.on_commit(lambda: release_image(name))
+
+
+def release_image(name):
+    """Удаляет файл без ссылок вместе со строкой StoredImage.
+
+    Строка удаляется первой и в одной транзакции с файлом: загрузка
+    того же файла ждет ее конца на блокировке строки, а потом не найдет
+    файла и запишет его заново.
+    """
+    with transaction.atomic():
+        deleted, _ = StoredImage.objects.filter(
+            name=name, references=0
+        ).delete()
+        if deleted:
+            thumbnails.delete(name)
+
+
+def _batches(queryset, batch_size):
+    """Идентификаторы queryset пачками по возрастанию pk."""
+    last = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def _counts(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values_list(field, 'total')
+    )
+
+
+def reconcile_posts(batch_size):
+    """Исправляет счетчики комментариев. Возвращает число правок."""
+    fixed = 0
+    for batch in _batches(Post.objects.all(), batch_size):
+        actual = _counts(Comment.objects, 'post_id', batch)
+        stored = Post.objects.filter(pk__in=batch).values_list(
+            'pk', 'comments_count'
+        )
+        for pk, count in stored:
+            if actual.get(pk, 0) != count:
+                Post.objects.filter(pk=pk).update(
+                    comments_count=actual.get(pk, 0)
+                )
+                fixed += 1
+    return fixed
+
+
+def reconcile_users(batch_size):
+    """Исправляет счетчики пользователей. Возвращает число правок."""
+    fixed = 0
+    for batch in _batches(User.objects.all(), batch_size):
+        actual = {
+            'posts_count': _counts(Post.objects, 'author_id', batch),
+            'followers_count': _counts(Follow.objects, 'author_id', batch),
+            'following_count': _counts(Follow.objects, 'user_id', batch),
+        }
+        stored = {
+            stats[0]: stats[1:]
+            for stats in UserStats.objects.filter(
+                user_id__in=batch
+            ).values_list('user_id', *USER_COUNTERS)
+        }
+        for user_id in batch:
+            values = {
+                field: actual[field].get(user_id, 0)
+                for field in USER_COUNTERS
+            }
+            if stored.get(user_id) != tuple(values.values()):
+                UserStats.objects.update_or_create(
+                    user_id=user_id, defaults=values
+                )
+                fixed += 1
+    return fixed
+
+
+def reconcile_images():
+    """Исправляет число ссылок на файлы картинок. Файлы, на которые
+    больше не ссылаются, удаляются. Возвращает число правок."""
+    actual = dict(
+        Post.objects.exclude(image='').order_by().values('image').annotate(
+            total=Count('pk')
+        ).values_list('image', 'total')
+    )
+    stored = dict(StoredImage.objects.values_list('name', 'references'))
+    fixed = 0
+    for name in actual.keys() | stored.keys():
+        references = actual.get(name, 0)
+        if stored.get(name) == references:
+            continue
+        StoredImage.objects.update_or_create(
+            name=name, defaults={'references': references}
+        )
+        if not references:
+            transaction.on_commit(lambda name=name: release_image(name))
+        fixed += 1
+    return fixed
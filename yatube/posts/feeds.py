@@ -0,0 +1,150 @@
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Celebrity, FeedItem, Follow, Post
+from .paginators import MergedCursorPaginator
+
+FEED_BATCH_SIZE = getattr(settings, 'FEED_BATCH_SIZE', 500)
+
+
+def _bulk_insert(items):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_celebrity(author_id):
+    return Celebrity.objects.filter(author_id=author_id).exists()
+
+
+def push_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Посты популярных авторов не раскладываются: их подмешивает
+    ``follow_feed`` при чтении.
+    """
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        FeedItem(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            created=post.created,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'created')
+    _bulk_insert(
+        FeedItem(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            created=created,
+        )
+        for post_id, created in posts.iterator()
+    )
+
+
+def backfill_all():
+    """Раскладывает посты по лентам всех подписок.
+
+    Нужна после массовой загрузки в обход сигналов. Повторный запуск
+    безопасен: существующие записи ленты пропускаются.
+    """
+    reclassify(settings.FEED_CELEBRITY_FOLLOWERS)
+    follows = Follow.objects.filter(
+        author__celebrity__isnull=True
+    ).order_by().values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user, per_page):
+    """Пагинатор ленты подписок: разложенные посты из ленты
+    пользователя плюс посты популярных авторов, выбранные при чтении."""
+    sources = [(
+        user.feed_items.select_related('post__author', 'post__group'),
+        'post_id',
+        attrgetter('post'),
+    )]
+    celebrities = list(Follow.objects.filter(
+        user=user, author__celebrity__isnull=False
+    ).values_list('author_id', flat=True))
+    if celebrities:
+        sources.append(
+            (
+                Post.objects.filter(
+                    author_id__in=celebrities
+                ).select_related('author', 'group'),
+                'pk',
+                None,
+            )
+        )
+    return MergedCursorPaginator(sources, per_page)
+
+
+@transaction.atomic
+def promote(author_id, followers):
+    """Переводит автора на выборку при чтении."""
+    Celebrity.objects.update_or_create(
+        author_id=author_id, defaults={'followers': followers}
+    )
+    FeedItem.objects.filter(author_id=author_id).delete()
+
+
+@transaction.atomic
+def demote(author_id):
+    """Возвращает автора к раскладке по лентам подписчиков."""
+    Celebrity.objects.filter(author_id=author_id).delete()
+    for user_id in Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator():
+        backfill(user_id, author_id)
+
+
+def reclassify(threshold):
+    """Пересчитывает популярных авторов по порогу подписчиков.
+
+    Возвращает пару (повышенные, пониженные) идентификаторов авторов.
+    """
+    counts = dict(
+        Follow.objects.order_by().values('author').annotate(
+            total=Count('pk')
+        ).filter(total__gte=threshold).values_list('author', 'total')
+    )
+    current = set(Celebrity.objects.values_list('author_id', flat=True))
+    promoted = [author for author in counts if author not in current]
+    demoted = [author for author in current if author not in counts]
+    for author_id in promoted:
+        promote(author_id, counts[author_id])
+    for author_id in demoted:
+        demote(author_id)
+    for author_id in counts.keys() & current:
+        Celebrity.objects.filter(author_id=author_id).update(
+            followers=counts[author_id]
+        )
+    return promoted, demoted
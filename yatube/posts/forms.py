@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -13,6 +15,21 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            return images.normalize(image)
+        except images.ImageTooLarge:
+            raise forms.ValidationError(
+                'Картинка слишком большая, загрузите поменьше.'
+            )
+        except images.InvalidImage:
+            raise forms.ValidationError(
+                'Файл картинки поврежден, загрузите другой.'
+            )
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
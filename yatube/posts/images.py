@@ -0,0 +1,140 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+class InvalidImage(ValueError):
+    """Картинку нельзя прочитать: файл поврежден или обрезан."""
+
+
+class ImageTooLarge(InvalidImage):
+    """В картинке больше IMAGE_MAX_PIXELS пикселей."""
+
+
+# Ошибки Pillow при чтении битого файла или «бомбы» распаковки.
+DECODE_ERRORS = (OSError, SyntaxError, Image.DecompressionBombError)
+
+
+def open_image(file):
+    """Открывает картинку, не декодируя пиксели, и проверяет размер."""
+    file.seek(0)
+    try:
+        image = Image.open(file)
+    except DECODE_ERRORS as error:
+        raise InvalidImage(f'Картинку нельзя прочитать: {error}') from error
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise ImageTooLarge(
+            f'Картинка {image.width}x{image.height} больше '
+            f'{settings.IMAGE_MAX_PIXELS} пикселей'
+        )
+    return image
+
+
+def validate_image(value):
+    """Валидатор поля картинки для форм мимо PostForm, например админки.
+
+    Картинка декодируется целиком, поэтому обрезанный файл не доходит
+    до normalize при сохранении. Сохраненные и уже нормализованные
+    файлы не проверяются.
+    """
+    if getattr(value, '_committed', True):
+        return
+    file = value.file
+    if getattr(file, 'normalized', False):
+        return
+    try:
+        image = open_image(file)
+        image.load()
+    except InvalidImage as error:
+        raise ValidationError(str(error))
+    except DECODE_ERRORS as error:
+        raise ValidationError(f'Картинку нельзя прочитать: {error}')
+    finally:
+        file.seek(0)
+
+
+def output_format(image, source_format):
+    """Форматы для веба сохраняются, остальные переводятся в JPEG
+    или, если есть прозрачность, в PNG."""
+    if source_format in EXTENSIONS:
+        return source_format
+    if image.mode in ('RGBA', 'LA', 'P'):
+        return 'PNG'
+    return 'JPEG'
+
+
+def save_options(image_format, icc_profile):
+    quality = settings.IMAGE_QUALITY
+    options = {
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+        'PNG': {'optimize': True},
+        'WEBP': {'quality': quality, 'method': 4},
+    }[image_format]
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    return options
+
+
+def normalize(file):
+    """Уменьшает картинку до IMAGE_MAX_SIZE по большей стороне,
+    поворачивает по EXIF-ориентации и пересжимает без метаданных.
+
+    JPEG декодируется сразу в уменьшенном масштабе, а результат
+    пишется во временный файл, который держится в памяти только до
+    FILE_UPLOAD_MAX_MEMORY_SIZE. GIF не меняется, чтобы не потерять
+    анимацию. Если пересжатие ничего не дало, возвращается исходный
+    файл. У результата стоит атрибут ``normalized``. Битый файл
+    вызывает InvalidImage.
+    """
+    image = open_image(file)
+    source_format = image.format
+    if source_format == 'GIF':
+        file.normalized = True
+        file.seek(0)
+        return file
+    limit = settings.IMAGE_MAX_SIZE
+    size = image.size
+    try:
+        metadata = image.getexif()
+        if source_format == 'JPEG':
+            scale = limit / max(size)
+            image.draft(
+                'RGB', (int(size[0] * scale), int(size[1] * scale))
+            )
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+    except DECODE_ERRORS as error:
+        raise InvalidImage(f'Картинку нельзя прочитать: {error}') from error
+    file.normalized = True
+    image_format = output_format(image, source_format)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(
+        output, format=image_format,
+        **save_options(image_format, icc_profile),
+    )
+    changed = (
+        image.size != size
+        or len(metadata)
+        or image_format != source_format
+    )
+    if not changed and output.tell() >= file.size:
+        output.close()
+        file.seek(0)
+        return file
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(file.name))[0]
+    result = File(output, name=name + EXTENSIONS[image_format])
+    result.normalized = True
+    return result
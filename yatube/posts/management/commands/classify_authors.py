@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.feeds import reclassify
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярных авторов: их посты подмешиваются в ленту '
+        'подписок при чтении, а не раскладываются по лентам подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            default=settings.FEED_CELEBRITY_FOLLOWERS,
+            help='Число подписчиков, с которого автор считается популярным.',
+        )
+
+    def handle(self, *args, **options):
+        promoted, demoted = reclassify(options['threshold'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Повышено авторов: {len(promoted)}, '
+            f'понижено: {len(demoted)}.'
+        ))
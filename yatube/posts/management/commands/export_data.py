@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.export import FORMATS, KINDS, lines
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает записи, комментарии или подписки в CSV '
+        'или JSONL. Память не зависит от числа строк.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'kind', choices=tuple(KINDS), help='Что выгружать.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default='jsonl',
+            help='Формат выгрузки.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки. По умолчанию stdout.',
+        )
+
+    def handle(self, *args, **options):
+        queryset = KINDS[options['kind']].objects.all()
+        export = lines(queryset, options['format'])
+        if not options['output']:
+            for line in export:
+                self.stdout.write(line, ending='')
+            return
+        with open(
+            options['output'], 'w', encoding='utf-8', newline=''
+        ) as output:
+            output.writelines(export)
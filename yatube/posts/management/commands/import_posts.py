@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import insert_rows, rebuild_derived
+from posts.models import Comment, Group, ImportCheckpoint, Post, User
+
+POSTS = 'posts'
+COMMENTS = 'comments'
+POST_FIELDS = (
+    'author', 'group', 'text', 'image', 'comments_count', 'created',
+    'updated',
+)
+COMMENT_FIELDS = ('post', 'author', 'text', 'created')
+
+
+class SkipRow(Exception):
+    """Строку нельзя загрузить: нет автора, группы или записи."""
+
+
+def read_rows(path, file_format):
+    """Потоково читает строки файла: словари CSV или непустые строки
+    JSONL, которые разбирает parse_row."""
+    with open(path, encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield line
+
+
+def parse_row(row):
+    """Словарь строки; битая строка JSONL вызывает SkipRow."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as error:
+            raise SkipRow(f'неверный JSON: {error}')
+    if not isinstance(row, dict):
+        raise SkipRow('строка не объект JSON')
+    return row
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает записи или комментарии из JSONL или CSV пачками '
+        'INSERT. Авторы ищутся по username, группы по slug, '
+        'комментарии ссылаются на id записи. После сбоя загрузка '
+        'продолжается с контрольной точки, которая хранится в базе '
+        'и пишется в одной транзакции со строками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv.')
+        parser.add_argument(
+            '--kind',
+            choices=(POSTS, COMMENTS),
+            default=POSTS,
+            help='Что загружать.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла. По умолчанию по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10_000,
+            help='Строк в одном executemany.',
+        )
+        parser.add_argument(
+            '--transaction-size',
+            type=int,
+            default=50_000,
+            help='Строк в одной транзакции; после каждой сохраняется '
+                 'контрольная точка.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать сначала, не глядя на контрольную точку.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересобирать счетчики, ленты и индекс поиска, '
+                 'например, если дальше грузится еще один файл.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Нет файла {path}.')
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        self.kind = options['kind']
+        self.checkpoint = f'{self.kind}:{os.path.abspath(path)}'
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        if self.kind == POSTS:
+            self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        else:
+            self.posts = set(Post.objects.values_list('pk', flat=True))
+        self.now = timezone.now()
+        self.model = Post if self.kind == POSTS else Comment
+
+        done = 0 if options['restart'] else self.load_checkpoint()
+        rows = islice(read_rows(path, file_format), done, None)
+        loaded = skipped = 0
+        while True:
+            chunk = list(islice(rows, options['transaction_size']))
+            if not chunk:
+                break
+            built = self.build_chunk(chunk, done)
+            count = sum(len(values) for values in built.values())
+            loaded += count
+            skipped += len(chunk) - count
+            done += len(chunk)
+            with transaction.atomic():
+                for fields, values in built.items():
+                    insert_rows(
+                        self.model, fields, values, options['batch_size']
+                    )
+                self.save_checkpoint(done)
+            self.stdout.write(f'Загружено строк: {done}')
+        if done and not options['no_rebuild']:
+            rebuild_derived(options['batch_size'], self.stdout.write)
+        # Точка удаляется только после пересборки: если она упадет,
+        # повторный запуск не загрузит строки второй раз.
+        ImportCheckpoint.objects.filter(source=self.checkpoint).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено: {loaded}, пропущено: {skipped}.'
+        ))
+
+    def load_checkpoint(self):
+        done = ImportCheckpoint.objects.filter(
+            source=self.checkpoint
+        ).values_list('rows', flat=True).first()
+        if done is None:
+            return 0
+        self.stdout.write(f'Продолжение со строки {done + 1}.')
+        return done
+
+    def save_checkpoint(self, done):
+        ImportCheckpoint.objects.update_or_create(
+            source=self.checkpoint, defaults={'rows': done}
+        )
+
+    def lookup(self, mapping, key, title):
+        try:
+            return mapping[key]
+        except (KeyError, TypeError):
+            raise SkipRow(f'{title} {key!r} не найден')
+
+    def post_id(self, value):
+        try:
+            post_id = int(value)
+        except (TypeError, ValueError):
+            raise SkipRow(f'неверный id записи {value!r}')
+        if post_id not in self.posts:
+            raise SkipRow(f'запись {post_id} не найдена')
+        return post_id
+
+    def created(self, row):
+        value = row.get('created')
+        if not value:
+            return self.now
+        try:
+            created = parse_datetime(value)
+        except (TypeError, ValueError):
+            created = None
+        if created is None:
+            raise SkipRow(f'неверная дата {value!r}')
+        if timezone.is_naive(created):
+            created = timezone.make_aware(created, timezone.utc)
+        return created
+
+    def build_chunk(self, chunk, done):
+        """Строки транзакции, сгруппированные по набору полей."""
+        built = {}
+        for number, row in enumerate(chunk, done + 1):
+            try:
+                fields, values = self.build(row)
+            except SkipRow as error:
+                self.stderr.write(f'Строка {number}: {error}')
+                continue
+            built.setdefault(fields, []).append(values)
+        return built
+
+    def build(self, row):
+        """Поля и значения строки для insert_rows."""
+        row = parse_row(row)
+        author_id = self.lookup(self.authors, row.get('author'), 'автор')
+        text = row.get('text')
+        if not text:
+            raise SkipRow('пустой текст')
+        created = self.created(row)
+        if self.kind == COMMENTS:
+            post_id = self.post_id(row.get('post'))
+            return COMMENT_FIELDS, (post_id, author_id, text, created)
+        group = row.get('group')
+        group_id = self.lookup(self.groups, group, 'группа') if group else None
+        values = (group_id, text, '', 0, created, created)
+        if row.get('id'):
+            try:
+                post_id = int(row['id'])
+            except (TypeError, ValueError):
+                raise SkipRow(f'неверный id записи {row["id"]!r}')
+            return ('id',) + POST_FIELDS, (post_id, author_id) + values
+        return POST_FIELDS, (author_id,) + values
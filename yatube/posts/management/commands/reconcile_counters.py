@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_images, reconcile_posts, reconcile_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счетчики записей, комментариев, '
+        'подписок и ссылок на картинки с данными и исправляет '
+        'расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк сверять за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = reconcile_posts(batch_size)
+        users = reconcile_users(batch_size)
+        images = reconcile_images()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено записей: {posts}, пользователей: {users}, '
+            f'картинок: {images}.'
+        ))
@@ -0,0 +1,135 @@
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+from mixer.backend.django import Mixer
+
+from posts.bulk import rebuild_derived
+from posts.models import Comment, Follow, Group, Post, User
+
+TEXT_POOL = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для бенчмарков: пользователи, группы, '
+        'записи, комментарии и подписки. Записи вставляются пачками '
+        'в обход сигналов, поэтому ленты, счетчики и поисковый индекс '
+        'пересобираются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ('users', 10_000),
+            ('groups', 100),
+            ('posts', 1_000_000),
+            ('comments', 5_000_000),
+            ('follows', 500_000),
+        ):
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                default=default,
+                help=f'Сколько создать (по умолчанию {default}).',
+            )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк вставлять за один INSERT.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора, чтобы данные повторялись.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.random = random.Random(options['seed'])
+        fake = Faker('ru_RU')
+        fake.seed_instance(options['seed'])
+        self.texts = [fake.paragraph() for _ in range(TEXT_POOL)]
+        self.comments = [fake.sentence() for _ in range(TEXT_POOL)]
+        mixer = Mixer(commit=False, locale='ru_RU')
+        users = User.objects.count()
+        groups = Group.objects.count()
+
+        user_ids = self.insert(User, mixer.cycle(options['users']).blend(
+            User,
+            username=mixer.sequence(lambda i: f'bench{users + i}'),
+            password=make_password('bench'),
+            is_staff=False,
+            is_superuser=False,
+        ))
+        group_ids = self.insert(Group, mixer.cycle(options['groups']).blend(
+            Group,
+            slug=mixer.sequence(lambda i: f'bench-{groups + i}'),
+            title=mixer.faker.sentence,
+            description=mixer.faker.paragraph,
+        ))
+        if not user_ids:
+            user_ids = list(User.objects.values_list('pk', flat=True))
+        choices = group_ids + [None]
+        post_ids = self.insert(Post, (
+            Post(
+                author_id=self.random.choice(user_ids),
+                group_id=self.random.choice(choices),
+                text=self.random.choice(self.texts),
+            )
+            for _ in range(options['posts'])
+        ))
+        self.insert(Comment, (
+            Comment(
+                post_id=self.random.choice(post_ids),
+                author_id=self.random.choice(user_ids),
+                text=self.random.choice(self.comments),
+            )
+            for _ in range(options['comments'] if post_ids else 0)
+        ), returning=False)
+        self.insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in self.follow_pairs(
+                user_ids, options['follows']
+            )
+        ), returning=False)
+
+        rebuild_derived(self.batch_size, self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Готово.'))
+
+    def follow_pairs(self, user_ids, total):
+        total = min(total, len(user_ids) * (len(user_ids) - 1))
+        pairs = set()
+        while len(pairs) < total:
+            user_id, author_id = self.random.sample(user_ids, 2)
+            if (user_id, author_id) not in pairs:
+                pairs.add((user_id, author_id))
+                yield user_id, author_id
+
+    def insert(self, model, objects, returning=True):
+        """Вставляет объекты пачками и возвращает pk новых строк."""
+        last = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {total}', ending='\r'
+            )
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+        if not returning:
+            return []
+        return list(model.objects.filter(pk__gt=last).values_list(
+            'pk', flat=True
+        ))
@@ -0,0 +1,61 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feed(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    FeedItem = apps.get_model('posts', 'FeedItem')
+    for user_id, author_id in Follow.objects.values_list('user_id', 'author_id'):
+        FeedItem.objects.bulk_create(
+            [
+                FeedItem(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    created=created,
+                )
+                for post_id, created in Post.objects.filter(
+                    author_id=author_id
+                ).values_list('pk', 'created')
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_auto_20230325_2009'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата создания записи')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='posts.Post', verbose_name='Запись')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-created'], name='feed_item_user_created'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
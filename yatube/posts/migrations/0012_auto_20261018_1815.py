@@ -0,0 +1,71 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post.objects.update(comments_count=count_of(Comment, 'post'))
+    users = User.objects.annotate(
+        posts_total=count_of(Post, 'author'),
+        followers_total=count_of(Follow, 'author'),
+        following_total=count_of(Follow, 'user'),
+    ).values_list('pk', 'posts_total', 'followers_total', 'following_total')
+    UserStats.objects.bulk_create(
+        [
+            UserStats(
+                user_id=pk,
+                posts_count=posts,
+                followers_count=followers,
+                following_count=following,
+            )
+            for pk, posts, followers, following in users.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_celebrity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счетчики пользователя',
+                'verbose_name_plural': 'Счетчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:23
+
+import re
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_fts(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} "
+                f"USING fts5(text, tokenize='unicode61')"
+            )
+    except OperationalError:
+        return False
+    return True
+
+
+def fill_search_index(apps, schema_editor):
+    if create_fts(schema_editor):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM posts_post'
+            )
+        return
+    Post = apps.get_model('posts', 'Post')
+    PostTerm = apps.get_model('posts', 'PostTerm')
+    for pk, text in Post.objects.values_list('pk', 'text').iterator():
+        words = Counter(re.findall(r'\w{1,100}', text.lower()))
+        PostTerm.objects.bulk_create(
+            PostTerm(post_id=pk, term=term, weight=weight)
+            for term, weight in words.items()
+        )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20261018_1815'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='posts.Post', verbose_name='Запись')),
+            ],
+            options={
+                'verbose_name': 'Слово индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_post_term'),
+        ),
+        migrations.RunPython(fill_search_index, drop_fts),
+    ]
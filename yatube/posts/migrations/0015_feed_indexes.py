@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_updated'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='feeditem',
+            name='feed_item_user_created',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created', '-id'], name='comment_post_created'),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-created', '-post'], name='feed_item_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['user', 'author'], name='follow_user_author'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created', '-id'], name='post_author_created'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-created', '-id'], name='post_group_created'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_stored_image'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('source', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('rows', models.PositiveIntegerField(default=0, verbose_name='Загружено строк')),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка загрузки',
+                'verbose_name_plural': 'Контрольные точки загрузки',
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:03
+
+from django.db import migrations, models
+import posts.images
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', validators=[posts.images.validate_image], verbose_name='Картинка'),
+        ),
+    ]
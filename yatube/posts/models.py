@@ -3,6 +3,9 @@ from django.db import models
 
 from core.models import CreatedModel
 
+from .images import validate_image
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -46,13 +49,32 @@ class Post(CreatedModel):
         help_text='Выберите подходящую группу')
     image = models.ImageField(
         upload_to='posts/',
+        storage=post_images,
+        validators=[validate_image],
         blank=True,
         verbose_name="Картинка")
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Комментариев")
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения")
 
     class Meta:
         ordering = ('-created',)
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        indexes = (
+            models.Index(
+                fields=['author', '-created', '-id'],
+                name='post_author_created'
+            ),
+            models.Index(
+                fields=['group', '-created', '-id'],
+                name='post_group_created'
+            ),
+        )
 
     def __str__(self):
         return self.text
@@ -77,6 +99,12 @@ class Comment(CreatedModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -104,3 +132,173 @@ class Follow(models.Model):
             fields=['author', 'user'],
             name='unique_follow'
         ),)
+        indexes = (
+            models.Index(
+                fields=['user', 'author'],
+                name='follow_user_author'
+            ),
+        )
+
+
+class FeedItem(models.Model):
+    """Запись в ленте подписчика: пост автора, на которого он подписан."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Запись'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания записи'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        ordering = ('-created',)
+        constraints = (models.UniqueConstraint(
+            fields=['user', 'post'],
+            name='unique_feed_item'
+        ),)
+        indexes = (
+            models.Index(
+                fields=['user', '-created', '-post'],
+                name='feed_item_user_created'
+            ),
+        )
+
+
+class Celebrity(models.Model):
+    """Автор с большим числом подписчиков.
+
+    Посты таких авторов не раскладываются по лентам подписчиков,
+    а подмешиваются в ленту при чтении.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='celebrity',
+        verbose_name='Автор'
+    )
+    followers = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков при пересчете'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Записей'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class StoredImage(models.Model):
+    """Файл картинки в хранилище по содержимому и число записей,
+    которые на него ссылаются."""
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Файл'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ссылок'
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько строк файла уже загрузила команда import_posts.
+
+    Пишется в той же транзакции, что и сами строки, поэтому после
+    сбоя загрузка не повторяет закоммиченные строки.
+    """
+    source = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Файл'
+    )
+    rows = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Загружено строк'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка загрузки'
+        verbose_name_plural = 'Контрольные точки загрузки'
+
+    def __str__(self):
+        return f'{self.source}: {self.rows}'
+
+
+class PostTerm(models.Model):
+    """Строка обратного индекса поиска: слово и запись, где оно есть.
+
+    Используется, когда база не поддерживает FTS5.
+    """
+    term = models.CharField(
+        max_length=100,
+        verbose_name='Слово'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='terms',
+        verbose_name='Запись'
+    )
+    weight = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Вхождений'
+    )
+
+    class Meta:
+        verbose_name = 'Слово индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = (models.UniqueConstraint(
+            fields=['term', 'post'],
+            name='unique_post_term'
+        ),)
@@ -0,0 +1,211 @@
+from django.core import signing
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .cache import cached_count
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def count_feed(model):
+    """Лента, версия которой сбрасывает закешированные количества."""
+    return f'count:{model._meta.label_lower}'
+
+
+class CachedCountPaginator(Paginator):
+    """Постраничный пагинатор с закешированным количеством объектов.
+
+    Количество хранится в кеше под версией ленты ``feed`` (по умолчанию
+    своей для каждой модели) и сбрасывается сигналами при создании,
+    правке и удалении записей.
+    """
+    def __init__(self, object_list, per_page, *args, feed=None, **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.feed = feed or count_feed(object_list.model)
+
+    @cached_property
+    def count(self):
+        return cached_count(self.feed, self.object_list)
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (created, id) без COUNT(*) и OFFSET.
+
+    Страница адресуется непрозрачным токеном курсора, номер страницы
+    хранится внутри токена и нужен только для отображения. Глубокие
+    страницы стоят столько же, сколько первая.
+
+    Старые ссылки ?page=N открываются через OFFSET только до страницы
+    max_number, дальше отдается первая страница.
+    """
+    salt = 'posts.paginators.cursor'
+    max_number = 10
+
+    def __init__(self, object_list, per_page, key='created', tiebreak='pk',
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key = key
+        self.tiebreak = tiebreak
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        """Известное курсору число страниц: текущая и, если есть,
+        следующая. Общее количество не считается."""
+        return self._num_pages
+
+    def position(self, obj):
+        return getattr(obj, self.key), getattr(obj, self.tiebreak)
+
+    def encode(self, obj, number, direction):
+        value, tie = self.position(obj)
+        return signing.dumps(
+            [value.isoformat(), tie, number, direction],
+            salt=self.salt,
+            compress=True,
+        )
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            value, tie, number, direction = signing.loads(
+                cursor, salt=self.salt
+            )
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        value = parse_datetime(value)
+        if value is None or direction not in (NEXT, PREVIOUS):
+            return None
+        return (value, tie), max(int(number), 1), direction
+
+    def cursor_page(self, cursor=None, number=None):
+        """Возвращает страницу по токену курсора.
+
+        Без курсора страница выбирается по номеру, чтобы старые ссылки
+        вида ?page=N продолжали работать.
+        """
+        state = self.decode(cursor)
+        if state is None:
+            return self._number_page(number)
+        position, number, direction = state
+        if direction == NEXT:
+            rows = self._fetch(position)
+            if not rows:
+                return self._number_page(1)
+            has_next = len(rows) > self.per_page
+            return self._build_page(rows[:self.per_page], number, has_next)
+        rows = self._fetch(position, reverse=True)
+        if len(rows) <= self.per_page:
+            return self._number_page(1)
+        rows = rows[:self.per_page][::-1]
+        return self._build_page(rows, max(number, 2), has_next=True)
+
+    def _fetch(self, position=None, reverse=False, bottom=0):
+        return self._slice(
+            self.object_list, self.tiebreak, position, reverse,
+            bottom, bottom + self.per_page + 1,
+        )
+
+    def _slice(self, queryset, tiebreak, position, reverse, bottom, top):
+        key = self.key
+        if reverse:
+            lookup, order = 'gt', (key, tiebreak)
+        else:
+            lookup, order = 'lt', (f'-{key}', f'-{tiebreak}')
+        if position is not None:
+            value, tie = position
+            queryset = queryset.filter(
+                Q(**{f'{key}__{lookup}': value})
+                | Q(**{key: value, f'{tiebreak}__{lookup}': tie})
+            )
+        return list(queryset.order_by(*order)[bottom:top])
+
+    def _number_page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if number > self.max_number:
+            number = 1
+        rows = self._fetch(bottom=(number - 1) * self.per_page)
+        if not rows and number > 1:
+            return self._number_page(1)
+        has_next = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number, has_next)
+
+    def _build_page(self, rows, number, has_next):
+        self._num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = (
+            self.encode(rows[-1], number + 1, NEXT) if has_next else None
+        )
+        page.previous_cursor = (
+            self.encode(rows[0], number - 1, PREVIOUS)
+            if number > 1 else None
+        )
+        return page
+
+    def dump(self, page):
+        """Состояние страницы, пригодное для записи в кеш."""
+        return (
+            list(page.object_list),
+            page.number,
+            page.next_cursor,
+            page.previous_cursor,
+        )
+
+    def load(self, state):
+        """Восстанавливает страницу из состояния ``dump``."""
+        rows, number, next_cursor, previous_cursor = state
+        self._num_pages = number + 1 if next_cursor else number
+        page = Page(rows, number, self)
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по строкам ``values()``: ключ и tiebreak
+    берутся из словаря строки."""
+
+    def __init__(self, object_list, per_page, key='created', tiebreak='id',
+                 **kwargs):
+        super().__init__(object_list, per_page, key, tiebreak, **kwargs)
+
+    def position(self, obj):
+        return obj[self.key], obj[self.tiebreak]
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по нескольким источникам сразу.
+
+    Источник задается кортежем (queryset, tiebreak, transform): поле
+    tiebreak источника совпадает с pk итогового объекта, а transform
+    превращает строку источника в этот объект. Страница собирается
+    слиянием отсортированных срезов всех источников.
+
+    Срез каждого источника начинается с начала ленты, поэтому номер
+    страницы не поддерживается: только первая страница и курсоры.
+    """
+    max_number = 1
+
+    @cached_property
+    def count(self):
+        return sum(queryset.count() for queryset, _, _ in self.object_list)
+
+    def _fetch(self, position=None, reverse=False, bottom=0):
+        top = bottom + self.per_page + 1
+        rows = {}
+        for queryset, tiebreak, transform in self.object_list:
+            for row in self._slice(
+                queryset, tiebreak, position, reverse, 0, top
+            ):
+                obj = transform(row) if transform else row
+                rows[obj.pk] = obj
+        return sorted(
+            rows.values(), key=self.position, reverse=not reverse
+        )[bottom:top]
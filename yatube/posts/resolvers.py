@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from . import cache
+from .models import Group, User
+
+
+class Resolver:
+    """Ограниченный LRU с TTL для поиска редко меняющихся строк
+    по уникальному полю.
+
+    Строка хранится в памяти процесса вместе с версией объекта
+    из кеша. Сигналы сохранения и удаления меняют версию. Другие
+    процессы видят правку сразу, только если кеш общий (SHARED_CACHE);
+    с LocMemCache и при недоступном кеше ее видно не позже чем через
+    RESOLVER_CACHE_TTL.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.names = [f.attname for f in model._meta.concrete_fields]
+        self.pk_index = self.names.index(model._meta.pk.attname)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _feed(self, pk):
+        return f'{self.model._meta.label_lower}:{pk}'
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            return None
+        expires, version, row = entry
+        if expires < time.monotonic():
+            return None
+        if cache.version(self._feed(row[self.pk_index])) != version:
+            return None
+        return row
+
+    def _store(self, key, row):
+        version = cache.version(self._feed(row[self.pk_index]))
+        expires = time.monotonic() + settings.RESOLVER_CACHE_TTL
+        with self._lock:
+            self._entries[key] = (expires, version, row)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.RESOLVER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Объект по значению поля или None."""
+        row = self._lookup(key)
+        if row is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            # Промах читает основную базу: строка с отстающей реплики
+            # закрепилась бы в LRU под новой версией.
+            row = self.model._default_manager.using(
+                DEFAULT_DB_ALIAS
+            ).filter(**{self.field: key}).values_list(*self.names).first()
+            if row is None:
+                return None
+            self._store(key, row)
+        return self.model.from_db(DEFAULT_DB_ALIAS, self.names, row)
+
+    def get_or_404(self, key):
+        obj = self.get(key)
+        if obj is None:
+            raise Http404(
+                f'{self.model._meta.object_name} {key!r} не найден'
+            )
+        return obj
+
+    def invalidate(self, pk):
+        """Сбрасывает объект в процессах, которые делят кеш."""
+        cache.bump([self._feed(pk)])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+        }
+
+
+groups = Resolver(Group, 'slug')
+users = Resolver(User, 'username')
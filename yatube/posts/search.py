@@ -0,0 +1,194 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Post, PostTerm
+
+FTS_TABLE = 'posts_post_fts'
+FTS5 = 'fts5'
+PYTHON = 'python'
+WORD = re.compile(r'\w{1,100}')
+
+_has_fts = None
+
+
+def tokenize(text):
+    return WORD.findall(text.lower())
+
+
+def has_fts():
+    """Есть ли в базе таблица FTS5, созданная миграцией."""
+    global _has_fts
+    if _has_fts is None:
+        _has_fts = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = %s",
+                    [FTS_TABLE],
+                )
+                _has_fts = cursor.fetchone() is not None
+    return _has_fts
+
+
+def backend():
+    """Бэкенд поиска: SEARCH_BACKEND из настроек или FTS5, если
+    таблица есть, иначе обратный индекс в PostTerm."""
+    choice = getattr(settings, 'SEARCH_BACKEND', None)
+    if choice:
+        return choice
+    return FTS5 if has_fts() else PYTHON
+
+
+def index_post(post):
+    """Переиндексирует текст записи."""
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+        return
+    PostTerm.objects.filter(post_id=post.pk).delete()
+    PostTerm.objects.bulk_create(
+        PostTerm(post_id=post.pk, term=term, weight=weight)
+        for term, weight in Counter(tokenize(post.text)).items()
+    )
+
+
+def unindex_post(post_id):
+    """Убирает запись из индекса. Строки PostTerm удаляются каскадом."""
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def rebuild(batch_size=1000):
+    """Строит индекс заново по всем записям."""
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+        return
+    PostTerm.objects.all().delete()
+    terms = []
+    posts = Post.objects.order_by().values_list('pk', 'text')
+    for pk, text in posts.iterator(chunk_size=batch_size):
+        terms.extend(
+            PostTerm(post_id=pk, term=term, weight=weight)
+            for term, weight in Counter(tokenize(text)).items()
+        )
+        if len(terms) >= batch_size:
+            PostTerm.objects.bulk_create(terms)
+            terms = []
+    PostTerm.objects.bulk_create(terms)
+
+
+class Query:
+    """Поисковый запрос: записи, содержащие все слова строки."""
+
+    def __init__(self, text):
+        self.terms = sorted(set(tokenize(text)))
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def match(self):
+        """Выражение MATCH для FTS5: каждое слово в кавычках,
+        чтобы операторы FTS5 из ввода не интерпретировались."""
+        return ' '.join(f'"{term}"' for term in self.terms)
+
+    def _terms(self):
+        return PostTerm.objects.filter(term__in=self.terms).order_by().values(
+            'post'
+        ).annotate(
+            found=Count('term'), score=Sum('weight')
+        ).filter(found=len(self.terms))
+
+    def post_ids(self):
+        """Подзапрос pk найденных записей без ранжирования."""
+        if backend() == FTS5:
+            return RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [self.match()],
+            )
+        return self._terms().values('post')
+
+    def count(self):
+        if not self:
+            return 0
+        if backend() == FTS5:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s',
+                    [self.match()],
+                )
+                return cursor.fetchone()[0]
+        return self._terms().count()
+
+    def ranked_ids(self, offset, limit):
+        """pk записей по убыванию релевантности."""
+        if not self:
+            return []
+        if backend() == FTS5:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s '
+                    f'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                    [self.match(), limit, offset],
+                )
+                return [row[0] for row in cursor.fetchall()]
+        return list(self._terms().order_by('-score', '-post').values_list(
+            'post', flat=True
+        )[offset:offset + limit])
+
+
+class SearchResults:
+    """Ленивый список найденных записей для Paginator.
+
+    Количество и срез страницы выполняются в индексе, сами записи
+    загружаются одним запросом только для текущей страницы.
+    """
+
+    def __init__(self, text):
+        self.query = Query(text)
+
+    def count(self):
+        return self.query.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        offset = index.start or 0
+        ids = self.query.ranked_ids(offset, index.stop - offset)
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search(text):
+    return SearchResults(text)
+
+
+def filter_posts(queryset, text):
+    """Сужает queryset до записей, найденных по индексу."""
+    query = Query(text)
+    if not query:
+        return queryset
+    return queryset.filter(pk__in=query.post_ids())
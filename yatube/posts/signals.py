@@ -0,0 +1,150 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, feeds, images, resolvers, search
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .paginators import count_feed
+
+
+@receiver(post_save, sender=Post)
+def push_new_post(sender, instance, created, **kwargs):
+    if created:
+        feeds.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feeds.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_feed(sender, instance, **kwargs):
+    feeds.trim(instance.user_id, instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, **kwargs):
+    # Ссылку на загружаемый файл берет хранилище при его сохранении.
+    instance._image_uploaded = bool(
+        instance.image and not instance.image._committed
+    )
+    if instance.pk is not None:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, '')
+        )
+
+
+@receiver(pre_save, sender=Post)
+def normalize_image(sender, instance, raw=False, **kwargs):
+    image = instance.image
+    if raw or not image or image._committed:
+        return
+    if not getattr(image.file, 'normalized', False):
+        instance.image = images.normalize(image.file)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    feeds = cache.post_feeds(
+        instance, getattr(instance, '_previous_group_id', None)
+    )
+    feeds.add(count_feed(Post))
+    cache.bump(feeds)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, **kwargs):
+    feeds = cache.post_feeds(instance.post)
+    feeds.add(count_feed(Comment))
+    cache.bump(feeds)
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_counter(
+            instance.author_id, 'followers_count', 1
+        )
+        counters.change_user_counter(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_user_counter(instance.author_id, 'followers_count', -1)
+    counters.change_user_counter(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    resolvers.groups.invalidate(instance.pk)
+    cache.bump([cache.NAMES_FEED])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    resolvers.users.invalidate(instance.pk)
+    # Вход пользователя меняет только last_login, которого не видно.
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        cache.bump([cache.NAMES_FEED])
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, **kwargs):
+    previous = '' if created else getattr(instance, '_previous_image', '')
+    current = instance.image.name or ''
+    uploaded = getattr(instance, '_image_uploaded', False)
+    if uploaded or previous != current:
+        if not uploaded:
+            counters.change_image_references(current, 1)
+        counters.change_image_references(previous, -1)
+
+
+@receiver(post_delete, sender=Post)
+def release_image_reference(sender, instance, **kwargs):
+    counters.change_image_references(instance.image.name, -1)
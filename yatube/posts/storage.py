@@ -0,0 +1,40 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла задается хешем содержимого.
+
+    Одинаковые картинки получают одно имя и хранятся один раз, поэтому
+    и миниатюры sorl, ключом которых служит имя, у них общие. Сколько
+    записей ссылается на файл, считает StoredImage; файл удаляется,
+    когда ссылок не остается.
+
+    Ссылка берется до проверки, есть ли уже файл: иначе освобождение
+    того же файла другой записью могло бы удалить его между проверкой
+    и сохранением записи.
+    """
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        name = posixpath.join(
+            posixpath.dirname(name),
+            digest[:2],
+            digest + os.path.splitext(name)[1].lower(),
+        )
+        from .counters import change_image_references
+        change_image_references(name, 1)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+post_images = ContentAddressedStorage()
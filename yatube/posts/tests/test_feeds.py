@@ -0,0 +1,79 @@
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Celebrity, FeedItem, Follow, Post, User
+
+
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.star = User.objects.create_user(username='testStar')
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.FOLLOW_URL = reverse('posts:follow_index')
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testAuthorized')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.fan = User.objects.create_user(username='testFan')
+        for user in (self.user, self.fan):
+            Follow.objects.create(user=user, author=HybridFeedTests.star)
+        Follow.objects.create(user=self.user, author=HybridFeedTests.author)
+
+    def test_reclassify_promotes_and_demotes(self):
+        """Команда переводит автора на выборку при чтении и обратно."""
+        Post.objects.create(author=HybridFeedTests.star, text='Пост звезды')
+        call_command('classify_authors', threshold=2)
+        self.assertTrue(
+            Celebrity.objects.filter(author=HybridFeedTests.star).exists()
+        )
+        self.assertFalse(
+            FeedItem.objects.filter(author=HybridFeedTests.star).exists()
+        )
+        Follow.objects.filter(user=self.fan).delete()
+        call_command('classify_authors', threshold=2)
+        self.assertFalse(Celebrity.objects.exists())
+        self.assertTrue(
+            FeedItem.objects.filter(
+                user=self.user, author=HybridFeedTests.star
+            ).exists()
+        )
+
+    def test_celebrity_posts_merged_at_read_time(self):
+        """Посты популярного автора не раскладываются по лентам,
+        но попадают в ленту подписок в порядке публикации."""
+        call_command('classify_authors', threshold=2)
+        posts = [
+            Post.objects.create(
+                author=author, text=f'Пост {i}'
+            )
+            for i, author in enumerate(
+                [HybridFeedTests.star, HybridFeedTests.author] * 8
+            )
+        ]
+        self.assertFalse(
+            FeedItem.objects.filter(author=HybridFeedTests.star).exists()
+        )
+        response = self.authorized_client.get(HybridFeedTests.FOLLOW_URL)
+        page_obj = response.context['page_obj']
+        seen = list(page_obj)
+        response = self.authorized_client.get(
+            HybridFeedTests.FOLLOW_URL, {'cursor': page_obj.next_cursor}
+        )
+        seen.extend(response.context['page_obj'])
+        self.assertEqual(seen, posts[::-1])
+
+    def test_page_number_is_not_offered(self):
+        """Лента подписок открывается по номеру только на первой
+        странице: остальные страницы доступны по курсору."""
+        Post.objects.create(author=HybridFeedTests.author, text='Пост')
+        for number in (2, '99999999999999999999'):
+            with self.subTest(page=number):
+                response = self.authorized_client.get(
+                    HybridFeedTests.FOLLOW_URL, {'page': number}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['page_obj'].number, 1)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -84,10 +85,11 @@ class PostFormTests(TestCase):
             data=create_form_data,
             follow=True
         )
+        digest = hashlib.sha256(small_gif).hexdigest()
         self.assertTrue(
             Post.objects.filter(
                 text=text,
-                image=f'posts/{small_gif_name}'
+                image=f'posts/{digest[:2]}/{digest}.gif'
             ).exists()
         )
         self.assertRedirects(response, post_aut_detail_url)
@@ -0,0 +1,134 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_photo(size=(1200, 800), orientation=None, image_format='JPEG'):
+    """Фото с EXIF-ориентацией, как его присылает телефон."""
+    exif = Image.Exif()
+    exif[0x010F] = 'Телефон'
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image = Image.new('RGB', size, 'navy')
+    image.paste('yellow', (0, 0, size[0] // 2, size[1] // 10))
+    image.save(buffer, format=image_format, exif=exif.tobytes())
+    return SimpleUploadedFile(
+        name=f'photo.{image_format.lower()}',
+        content=buffer.getvalue(),
+        content_type=f'image/{image_format.lower()}',
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=600, THUMBNAIL_WORKERS=0
+)
+class ImageNormalizationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def stored(self, post):
+        post.image.open()
+        image = Image.open(post.image)
+        image.load()
+        post.image.close()
+        return image
+
+    def test_form_downscales_and_strips_metadata(self):
+        """Форма уменьшает фото, поворачивает по ориентации
+        и убирает EXIF."""
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:post_create'), {
+            'text': 'Фото с телефона',
+            'image': make_photo(orientation=6),
+        })
+        post = Post.objects.get(text='Фото с телефона')
+        image = self.stored(post)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (400, 600))
+        self.assertEqual(len(image.getexif()), 0)
+        # Желтая полоса слева сверху после поворота справа сверху.
+        self.assertGreater(min(image.getpixel((395, 5))[:2]), 200)
+        self.assertLess(max(image.getpixel((395, 500))[:2]), 50)
+
+    def test_model_save_normalizes_uploads(self):
+        """Картинка, сохраненная мимо формы, тоже нормализуется,
+        а формат не для веба переводится в JPEG."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=make_photo(size=(900, 300), image_format='TIFF'),
+        )
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        image = self.stored(post)
+        self.assertEqual(image.size, (600, 200))
+        self.assertEqual(len(image.getexif()), 0)
+
+    def test_small_clean_image_is_kept(self):
+        """Картинка в пределах размера без метаданных не пересжимается
+        в файл больше исходного."""
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), 'navy').save(buffer, format='PNG')
+        upload = SimpleUploadedFile(
+            'small.png', buffer.getvalue(), content_type='image/png'
+        )
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=upload
+        )
+        self.assertLessEqual(post.image.size, len(buffer.getvalue()))
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_form_rejects_huge_image(self):
+        form = PostForm(
+            data={'text': 'Пост'}, files={'image': make_photo()}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_form_rejects_truncated_image(self):
+        """Обрезанный JPEG проходит проверку ImageField, но форма
+        отклоняет его, а не падает с 500."""
+        photo = make_photo(size=(3000, 2000))
+        photo = SimpleUploadedFile(
+            'photo.jpg', photo.read()[:photo.size // 2],
+            content_type='image/jpeg',
+        )
+        client = Client()
+        client.force_login(self.author)
+        response = client.post(reverse('posts:post_create'), {
+            'text': 'Обрезанное фото',
+            'image': photo,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].has_error('image'))
+        self.assertFalse(Post.objects.filter(text='Обрезанное фото').exists())
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_model_validation_rejects_huge_image(self):
+        """Формы мимо PostForm, например админка, проверяют размер
+        валидатором поля до сохранения."""
+        post = Post(author=self.author, text='Пост', image=make_photo())
+        with self.assertRaises(ValidationError) as context:
+            post.full_clean()
+        self.assertIn('image', context.exception.message_dict)
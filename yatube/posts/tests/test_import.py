@@ -0,0 +1,232 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..management.commands import import_posts
+from ..models import (
+    Comment, Follow, Group, ImportCheckpoint, Post, User, UserStats,
+)
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write(content)
+        return path
+
+    def call(self, *args, **kwargs):
+        call_command(
+            'import_posts', *args, stdout=StringIO(), stderr=StringIO(),
+            **kwargs
+        )
+
+    def test_import_jsonl_posts_and_comments(self):
+        """Записи и комментарии загружаются с исходными датами,
+        счетчики и индекс поиска пересобираются."""
+        rows = [
+            {'id': 100, 'author': 'testAuthor', 'group': 'test',
+             'text': 'Старый пост', 'created': '2015-05-01T12:00:00'},
+            {'author': 'testAuthor', 'text': 'Пост без группы'},
+            {'author': 'nobody', 'text': 'Неизвестный автор'},
+            {'author': 'testAuthor', 'group': 'missing', 'text': 'Нет группы'},
+        ]
+        path = self.write(
+            'posts.jsonl', '\n'.join(json.dumps(row) for row in rows)
+        )
+        self.call(path)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.created.year, 2015)
+        self.assertEqual(post.updated, post.created)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2
+        )
+        self.assertEqual(list(search.search('старый')[0:10]), [post])
+
+        path = self.write(
+            'comments.csv',
+            'post,author,text\n100,testAuthor,Комментарий\n'
+            '999,testAuthor,Нет записи\n',
+        )
+        self.call(path, kind='comments')
+        self.assertEqual(Comment.objects.get().post, post)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_resume_from_checkpoint(self):
+        """После сбоя загрузка продолжается с контрольной точки."""
+        path = self.write('posts.jsonl', '\n'.join(
+            json.dumps({'author': 'testAuthor', 'text': f'Пост {i}'})
+            for i in range(5)
+        ))
+        ImportCheckpoint.objects.create(source=f'posts:{path}', rows=3)
+        self.call(path, transaction_size=1)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Пост 3', 'Пост 4']
+        )
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_crash_does_not_duplicate_rows(self):
+        """Контрольная точка коммитится вместе со строками: после сбоя
+        строки без id не загружаются второй раз."""
+        path = self.write('posts.jsonl', '\n'.join(
+            json.dumps({'author': 'testAuthor', 'text': f'Пост {i}'})
+            for i in range(4)
+        ))
+        insert_rows = import_posts.insert_rows
+        calls = []
+
+        def crash_on_second_chunk(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('Сбой')
+            return insert_rows(*args)
+
+        with mock.patch.object(
+            import_posts, 'insert_rows', crash_on_second_chunk
+        ), self.assertRaises(RuntimeError):
+            self.call(path, transaction_size=2)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 2)
+        self.call(path, transaction_size=2)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост {i}' for i in range(4)]
+        )
+
+    def test_bad_rows_are_skipped(self):
+        """Битая строка JSONL, неверный id и несуществующая дата
+        пропускаются, а не останавливают загрузку."""
+        path = self.write('posts.jsonl', '\n'.join((
+            '{"author": "testAuthor", "text": "Первый пост"',
+            json.dumps({'author': 'testAuthor', 'text': 'Пост', 'id': 'x'}),
+            json.dumps({
+                'author': 'testAuthor', 'text': 'Пост',
+                'created': '2020-13-45T00:00:00',
+            }),
+            '[1, 2]',
+            json.dumps({'author': 'testAuthor', 'text': 'Хороший пост'}),
+        )))
+        stderr = StringIO()
+        call_command(
+            'import_posts', path, stdout=StringIO(), stderr=stderr
+        )
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Хороший пост']
+        )
+        self.assertEqual(len(stderr.getvalue().splitlines()), 4)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_checkpoint_survives_failed_rebuild(self):
+        """Если пересборка упала, контрольная точка остается,
+        и повторный запуск не загружает строки второй раз."""
+        path = self.write('posts.jsonl', json.dumps(
+            {'author': 'testAuthor', 'text': 'Пост'}
+        ))
+        with mock.patch.object(
+            import_posts, 'rebuild_derived', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.call(path)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 1)
+        self.call(path)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.reader = User.objects.create_user(username='testReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост, с "кавычками"', group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, kind, file_format):
+        output = StringIO()
+        call_command('export_data', kind, format=file_format, stdout=output)
+        return output.getvalue()
+
+    def test_export_formats(self):
+        """Выгрузка в JSONL и CSV в колонках import_posts."""
+        post = json.loads(self.export('posts', 'jsonl'))
+        self.assertEqual(post['author'], 'testAuthor')
+        self.assertEqual(post['group'], 'test')
+        self.assertEqual(post['text'], self.post.text)
+        rows = list(csv.DictReader(StringIO(self.export('comments', 'csv'))))
+        self.assertEqual(rows[0]['post'], str(self.post.pk))
+        self.assertEqual(
+            json.loads(self.export('follows', 'jsonl')),
+            {'user': 'testReader', 'author': 'testAuthor'}
+        )
+
+    def test_export_round_trips_through_import(self):
+        """Выгрузка загружается обратно командой import_posts."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'posts.csv')
+        call_command('export_data', 'posts', format='csv', output=path)
+        Post.objects.all().delete()
+        call_command(
+            'import_posts', path, stdout=StringIO(), stderr=StringIO()
+        )
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.created, self.post.created)
+
+    def test_admin_action_streams_selection(self):
+        """Действие админки отдает выбранные записи потоком."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'export_jsonl', '_selected_action': [self.post.pk]},
+        )
+        self.assertTrue(response.streaming)
+        self.assertIn(
+            'attachment', response['Content-Disposition']
+        )
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(json.loads(body)['id'], self.post.pk)
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User, UserStats
 
 
 class PostModelTest(TestCase):
@@ -81,3 +84,47 @@ class PostModelTest(TestCase):
                     post._meta.get_field(value).help_text,
                     expected
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.user = User.objects.create_user(username='testAuthorized')
+
+    def test_counters_follow_writes(self):
+        """Проверка счетчиков записей, комментариев и подписок."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        follow.delete()
+        post.delete()
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        """Проверка, что команда сверки исправляет расхождения."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        Post.objects.update(comments_count=7)
+        UserStats.objects.filter(user=self.author).update(posts_count=3)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
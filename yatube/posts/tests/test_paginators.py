@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..paginators import CachedCountPaginator, CursorPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.ADDPOSTS = 5
+
+        Post.objects.bulk_create(
+            Post(
+                author=cls.author,
+                text=f'{i + 1} длинный тестовый пост',
+                group=cls.group
+            )
+            for i in range(2 * settings.POSTS_PER_PAGE + cls.ADDPOSTS)
+        )
+        cls.INDEX_URL = reverse('posts:index')
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_walks_all_posts(self):
+        """Проход по курсорам отдает все записи без повторов
+        в порядке убывания даты."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.cursor_page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.cursor_page(page.next_cursor)
+            seen.extend(page)
+        expected = list(Post.objects.order_by('-created', '-pk'))
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), CursorPaginatorTests.ADDPOSTS)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же страницу, что и при проходе
+        вперед."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.cursor_page()
+        second = paginator.cursor_page(first.next_cursor)
+        third = paginator.cursor_page(second.next_cursor)
+        back = paginator.cursor_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(back.number, 2)
+        self.assertTrue(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_bad_cursor_returns_first_page(self):
+        """Поддельный курсор отдает первую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.cursor_page('garbage')
+        self.assertEqual(page.number, 1)
+        self.assertFalse(page.has_previous())
+
+    def test_large_page_number_returns_first_page(self):
+        """Номер страницы за пределом max_number и номер, который не
+        помещается в OFFSET, отдают первую страницу без ошибки."""
+        urls = (
+            CursorPaginatorTests.INDEX_URL,
+            reverse('posts:group_posts', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'testAuthor'}),
+        )
+        for url in urls:
+            for number in (CursorPaginator.max_number + 1,
+                           '99999999999999999999'):
+                with self.subTest(url=url, page=number):
+                    response = self.guest_client.get(url, {'page': number})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        response.context['page_obj'].number, 1
+                    )
+
+    def test_feed_skips_count_query(self):
+        """Лента не выполняет COUNT(*) и OFFSET для страниц по курсору."""
+        response = self.guest_client.get(CursorPaginatorTests.INDEX_URL)
+        cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                CursorPaginatorTests.INDEX_URL, {'cursor': cursor}
+            )
+        self.assertEqual(response.context['page_obj'].number, 2)
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'{i + 1} длинный тестовый пост')
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_until_post_created(self):
+        """Количество берется из кеша и сбрасывается созданием записи."""
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 10).count, 25
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 10).count, 25
+            )
+        Post.objects.create(author=self.author, text='Новая запись')
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 10).count, 26
+        )
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feeds, search
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def bad_steps(sql):
+    """Шаги плана SQLite с полным проходом таблицы или сортировкой
+    во временном B-дереве. Проход по индексу и поиск FTS5 допустимы."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        steps = [row[-1] for row in cursor.fetchall()]
+    return [
+        step for step in steps
+        if step.startswith('USE TEMP B-TREE') or (
+            step.startswith('SCAN ')
+            and ' USING ' not in step
+            and ' VIRTUAL TABLE ' not in step
+        )
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц идут по индексам, без полного прохода таблиц
+    и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.follower = User.objects.create_user(username='testFollower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Кот номер {i}'
+            )
+            for i in range(3)
+        ]
+        cls.post = posts[0]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.follower, text=f'Комментарий {i}'
+            )
+        feeds.promote(cls.author.pk, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def urls(self):
+        post = {'post_id': self.post.pk}
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'testAuthor'}),
+            reverse('posts:post_detail', kwargs=post),
+            reverse('posts:post_comments', kwargs=post),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=кот',
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': 'test'}),
+            reverse('api:profile', kwargs={'username': 'testAuthor'}),
+            reverse('api:post_detail', kwargs=post),
+        )
+
+    def test_views_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN есть только в SQLite')
+        for url in self.urls():
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in context.captured_queries:
+                    sql = query['sql']
+                    # Выдачу FTS5 нельзя не сортировать по релевантности,
+                    # но сортируются только совпадения, а не таблица.
+                    if not sql.startswith('SELECT') or (
+                        search.FTS_TABLE in sql and 'ORDER BY rank' in sql
+                    ):
+                        continue
+                    self.assertEqual(bad_steps(sql), [], sql)
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import resolvers
+from ..models import Group
+
+User = get_user_model()
+
+
+class ResolverTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.resolver = resolvers.Resolver(Group, 'slug')
+
+    def test_second_lookup_is_a_hit(self):
+        """Повторный поиск не обращается к базе и считается попаданием."""
+        self.resolver.get('test')
+        with self.assertNumQueries(0):
+            group = self.resolver.get('test')
+        self.assertEqual(group, self.group)
+        self.assertEqual(group.title, 'Тестовая группа')
+        self.assertEqual(
+            self.resolver.stats(), {'hits': 1, 'misses': 1, 'size': 1}
+        )
+
+    def test_missing_object(self):
+        """Несуществующий slug дает None и 404 и не кешируется."""
+        self.assertIsNone(self.resolver.get('missing'))
+        with self.assertRaises(Http404):
+            self.resolver.get_or_404('missing')
+        self.assertEqual(self.resolver.stats()['size'], 0)
+
+    def test_save_and_delete_invalidate(self):
+        """Сохранение и удаление группы сбрасывают запись."""
+        resolver = resolvers.groups
+        group = resolver.get('test')
+        group.title = 'Новое название'
+        group.save()
+        self.assertEqual(resolver.get('test').title, 'Новое название')
+        group.slug = 'renamed'
+        group.save()
+        self.assertIsNone(resolver.get('test'))
+        group.delete()
+        self.assertIsNone(resolver.get('renamed'))
+
+    @override_settings(RESOLVER_CACHE_SIZE=1)
+    def test_size_is_bounded(self):
+        """Самая давняя запись вытесняется при переполнении."""
+        Group.objects.create(title='Другая', slug='other')
+        self.resolver.get('test')
+        self.resolver.get('other')
+        self.assertEqual(self.resolver.stats()['size'], 1)
+        with self.assertNumQueries(1):
+            self.resolver.get('test')
+
+    @override_settings(RESOLVER_CACHE_TTL=-1)
+    def test_expired_entry_is_refetched(self):
+        """Просроченная запись читается из базы заново."""
+        self.resolver.get('test')
+        with self.assertNumQueries(1):
+            self.resolver.get('test')
+        self.assertEqual(self.resolver.stats()['misses'], 2)
+
+    def test_feed_pages_reuse_resolved_objects(self):
+        """Ленты группы и профиля берут группу и автора из LRU."""
+        client = Client()
+        for url in (
+            reverse('posts:group_posts', kwargs={'slug': 'test'}),
+            reverse('posts:profile', kwargs={'username': 'testAuthor'}),
+        ):
+            with self.subTest(url=url):
+                client.get(url)
+                hits = resolvers.groups.hits + resolvers.users.hits
+                self.assertEqual(client.get(url).status_code, 200)
+                self.assertEqual(
+                    resolvers.groups.hits + resolvers.users.hits, hits + 1
+                )
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, PostTerm
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.SEARCH_URL = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+        self.posts = [
+            Post.objects.create(author=self.author, text=text)
+            for text in (
+                'Кот сидит на окне',
+                'Кот и кот: два кота на окне',
+                'Собака лает на прохожих',
+            )
+        ]
+
+    def found(self, query):
+        response = self.guest_client.get(self.SEARCH_URL, {'q': query})
+        return list(response.context['page_obj'])
+
+    def check_search(self):
+        cat, cats, dog = self.posts
+        self.assertEqual(self.found('кот'), [cats, cat])
+        self.assertCountEqual(self.found('КОТ окне'), [cats, cat])
+        self.assertEqual(self.found('собака'), [dog])
+        self.assertEqual(self.found('кот собака'), [])
+        self.assertEqual(self.found('"кот"* -'), [cats, cat])
+        self.assertEqual(self.found(''), [])
+        dog.text = 'Собака и кот'
+        dog.save()
+        self.assertEqual(len(self.found('кот')), 3)
+        cats.delete()
+        self.assertEqual(self.found('кот окне'), [cat])
+
+    def test_fts_search(self):
+        """Поиск по FTS5 ранжирует записи и следит за правками."""
+        if not search.has_fts():
+            self.skipTest('SQLite собран без FTS5')
+        self.check_search()
+
+    @override_settings(SEARCH_BACKEND=search.PYTHON)
+    def test_python_search(self):
+        """Запасной обратный индекс ищет так же."""
+        for post in self.posts:
+            search.index_post(post)
+        self.assertTrue(PostTerm.objects.filter(term='кот').exists())
+        self.check_search()
+
+    def test_search_page_is_paginated(self):
+        """Результаты поиска выводятся страницами."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Кот номер {i}') for i in range(12)
+        )
+        for post in Post.objects.filter(text__startswith='Кот номер'):
+            search.index_post(post)
+        response = self.guest_client.get(
+            self.SEARCH_URL, {'q': 'кот', 'page': 2}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+        self.assertEqual(len(response.context['page_obj']), 4)
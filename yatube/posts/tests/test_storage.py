@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.test import TransactionTestCase, override_settings
+from sorl.thumbnail import default
+
+from .. import counters, thumbnails
+from ..models import Post, StoredImage, User
+from ..storage import post_images
+from .test_thumbnails import make_image
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTests(TransactionTestCase):
+    """Удаление файла при последней ссылке идет после коммита, поэтому
+    тесты работают с настоящими транзакциями."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='testAuthor')
+
+    def create(self, image):
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=image
+        )
+        thumbnails.enqueue(post.image.name)
+        return post
+
+    def thumbnail(self, post):
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        return default.backend.lookup(post.image.name, geometry, **options)
+
+    def references(self, post):
+        return StoredImage.objects.get(name=post.image.name).references
+
+    def test_duplicates_share_file_and_thumbnail(self):
+        """Одинаковые картинки хранятся одним файлом с общей миниатюрой."""
+        first = self.create(make_image('first.jpg'))
+        second = self.create(make_image('second.jpg'))
+        other = self.create(make_image(size=(1000, 800)))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+        self.assertEqual(self.references(first), 2)
+        self.assertEqual(
+            self.thumbnail(first).name, self.thumbnail(second).name
+        )
+
+    def test_file_is_deleted_with_last_reference(self):
+        first = self.create(make_image())
+        second = self.create(make_image())
+        thumbnail = self.thumbnail(first)
+        first.delete()
+        self.assertTrue(default_storage.exists(second.image.name))
+        self.assertEqual(self.references(second), 1)
+        second.delete()
+        self.assertFalse(default_storage.exists(second.image.name))
+        self.assertFalse(default_storage.exists(thumbnail.name))
+        self.assertFalse(StoredImage.objects.exists())
+
+    def test_release_during_duplicate_upload_keeps_file(self):
+        """Файл, который вторая загрузка уже застала на диске,
+        не удаляется освобождением последней старой ссылки."""
+        first = self.create(make_image())
+        exists = post_images.exists
+
+        def release_after_check(name):
+            found = exists(name)
+            if name == first.image.name and first.pk is not None:
+                first.delete()
+            return found
+
+        with mock.patch.object(
+            post_images, 'exists', side_effect=release_after_check
+        ):
+            second = self.create(make_image())
+        self.assertTrue(post_images.exists(second.image.name))
+        self.assertEqual(self.references(second), 1)
+
+    def test_reupload_to_same_post_keeps_one_reference(self):
+        post = self.create(make_image())
+        post.image = make_image('again.jpg')
+        post.save()
+        self.assertEqual(self.references(post), 1)
+
+    def test_replacing_image_moves_reference(self):
+        post = self.create(make_image())
+        old_name = post.image.name
+        post.image = make_image(size=(1000, 800))
+        post.save()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertEqual(self.references(post), 1)
+
+    def test_reconcile_restores_references(self):
+        post = self.create(make_image())
+        StoredImage.objects.all().delete()
+        self.assertEqual(counters.reconcile_images(), 1)
+        self.assertEqual(self.references(post), 1)
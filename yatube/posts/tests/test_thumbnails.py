@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name='photo.jpg', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, format='JPEG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        cache.clear()
+
+    def lookup(self, post):
+        geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+        return default.backend.lookup(post.image.name, geometry, **options)
+
+    def test_request_does_not_render_thumbnail(self):
+        """Страница записи отдает оригинал, пока миниатюры нет,
+        и не рендерит ее внутри запроса."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        response = self.author_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, post.image.url)
+        self.assertIsNone(self.lookup(post))
+        thumbnails.render(post.image.name)
+        thumbnail = self.lookup(post)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        response = self.author_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, thumbnail.url)
+
+    def test_page_offers_srcset_variants(self):
+        """Лента предлагает варианты миниатюры разной ширины
+        в формате srcset_format."""
+        post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', image=make_image()
+        )
+        thumbnails.render(post.image.name)
+        thumbnails.prefetch([post])
+        widths = [
+            int(source.split()[-1].rstrip('w'))
+            for source in post.thumbnail_srcset.split(', ')
+        ]
+        self.assertEqual(widths, list(settings.THUMBNAIL_SRCSET_WIDTHS))
+        extension = {'WEBP': '.webp', 'JPEG': '.jpg'}[
+            thumbnails.srcset_format()
+        ]
+        self.assertIn(extension + ' 320w', post.thumbnail_srcset)
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, f'type="{post.thumbnail_type}"')
+        self.assertContains(response, post.thumbnail_srcset)
+        self.assertContains(response, post.thumbnail.url)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_post_create_renders_thumbnails(self):
+        """Создание записи с картинкой сразу готовит миниатюры."""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новая запись', 'image': make_image('new.jpg')},
+        )
+        post = Post.objects.get(text='Новая запись')
+        self.assertIsNotNone(self.lookup(post))
+
+    def test_prefetch_resolves_page_in_one_pass(self):
+        """Миниатюры страницы разрешаются одним запросом к базе."""
+        posts = [
+            Post.objects.create(
+                author=self.author,
+                text=f'Пост {i}',
+                image=make_image(size=(1200, 800 + i)),
+            )
+            for i in range(3)
+        ]
+        thumbnails.render(posts[0].image.name)
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        self.assertIsNotNone(posts[0].thumbnail)
+        self.assertIsNone(posts[1].thumbnail)
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_failed_render_is_not_repeated(self):
+        """Картинка, миниатюры которой не удалось создать, не ставится
+        в очередь на каждом просмотре страницы."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с пропавшей картинкой',
+            image=make_image(size=(1100, 700)),
+        )
+        os.remove(post.image.path)
+        with mock.patch.object(
+            thumbnails, 'render', wraps=thumbnails.render
+        ) as render, self.assertLogs('sorl.thumbnail.base', 'ERROR'):
+            thumbnails.prefetch([post])
+            thumbnails.prefetch([post])
+        self.assertEqual(render.call_count, 1)
+        self.assertIsNone(post.thumbnail)
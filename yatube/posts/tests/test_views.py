@@ -9,7 +9,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Comment, Follow, Group, Post, User
+from core.tests import QueryBudgetMixin
+
+from ..models import Comment, FeedItem, Follow, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -73,6 +75,7 @@ class PostViewsTests(TestCase):
         self.author_client = Client()
         self.author_client.force_login(self.author)
         self.user = User.objects.create_user(username='testAuthorized')
+        cache.clear()
 
         self.urls_templates_data = [
             (PostViewsTests.INDEX_URL, 'posts/index.html'),
@@ -164,7 +167,7 @@ class PostViewsTests(TestCase):
         self.assertIsInstance(comment, Comment)
         self.assertEqual(comment.author, self.user)
         self.assertEqual(comment.post, PostViewsTests.post)
-        self.assertEqual(response.context['comments'].count(), 1)
+        self.assertEqual(len(response.context['comments']), 1)
         field = response.context['form'].fields['text']
         self.assertIsInstance(field, forms.fields.CharField)
 
@@ -224,11 +227,11 @@ class PostViewsTests(TestCase):
         current_content = self.author_client.get(
             PostViewsTests.INDEX_URL
         ).content
-        new_post.delete()
-        after_delete_post_content = self.author_client.get(
+        Post.objects.filter(pk=new_post.pk).update(text='Без сигналов')
+        cached_content = self.author_client.get(
             PostViewsTests.INDEX_URL
         ).content
-        self.assertEqual(current_content, after_delete_post_content)
+        self.assertEqual(current_content, cached_content)
         cache.clear()
         after_clear_cache_content = self.author_client.get(
             PostViewsTests.INDEX_URL
@@ -237,6 +240,48 @@ class PostViewsTests(TestCase):
             current_content, after_clear_cache_content
         )
 
+    def test_feed_cache_invalidated_on_delete(self):
+        """Проверяем, что удаление записи сбрасывает кеш лент."""
+        new_post = Post.objects.create(
+            text='Запись для удаления',
+            author=self.author,
+            group=PostViewsTests.group
+        )
+        for url in (
+            PostViewsTests.INDEX_URL,
+            PostViewsTests.GROUP_LIST_URL,
+            PostViewsTests.PROFILE_URL,
+        ):
+            self.assertContains(self.author_client.get(url), new_post.text)
+        new_post.delete()
+        for url in (
+            PostViewsTests.INDEX_URL,
+            PostViewsTests.GROUP_LIST_URL,
+            PostViewsTests.PROFILE_URL,
+        ):
+            with self.subTest(url=url):
+                self.assertNotContains(
+                    self.author_client.get(url), new_post.text
+                )
+
+    def test_feed_cache_is_page_aware(self):
+        """Проверяем, что в кеше у каждой страницы ленты свой ключ."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}')
+            for i in range(settings.POSTS_PER_PAGE)
+        )
+        cache.clear()
+        first = self.author_client.get(PostViewsTests.INDEX_URL)
+        second = self.author_client.get(
+            PostViewsTests.INDEX_URL,
+            {'cursor': first.context['page_obj'].next_cursor}
+        )
+        self.assertEqual(second.context['page_obj'].number, 2)
+        self.assertNotEqual(
+            list(first.context['page_obj']),
+            list(second.context['page_obj'])
+        )
+
 
 class PostPaginatorTests(TestCase):
     @classmethod
@@ -272,6 +317,7 @@ class PostPaginatorTests(TestCase):
     def setUp(self):
         self.author_client = Client()
         self.author_client.force_login(self.author)
+        cache.clear()
 
     def test_accordance_posts_per_pages(self):
         """Проверка количества постов
@@ -404,3 +450,302 @@ class FollowViewsTests(TestCase):
         )
         self.assertEqual(len(response.context['page_obj']), 0)
         self.assertNotContains(response, FollowViewsTests.post)
+
+    def test_feed_filled_on_post_and_trimmed_on_unfollow(self):
+        """Проверяем, что новая запись раскладывается в ленты подписчиков,
+        а после отписки посты автора убираются из ленты."""
+        Follow.objects.create(user=self.user, author=FollowViewsTests.author)
+        new_post = Post.objects.create(
+            author=FollowViewsTests.author,
+            text='Новый пост для ленты',
+        )
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.user, post=new_post).exists()
+        )
+        self.assertEqual(self.user.feed_items.count(), 2)
+        self.authorized_client.post(FollowViewsTests.PROFILE_UNFOLLOW_URL)
+        self.assertFalse(self.user.feed_items.exists())
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+        cls.POSTS = 2 * settings.POSTS_PER_PAGE
+        for i in range(cls.POSTS):
+            Post.objects.create(
+                author=cls.author,
+                text=f'{i + 1} длинный тестовый пост',
+                group=cls.group,
+                image=f'posts/{i}.jpg',
+            )
+        cls.post = Post.objects.latest('created')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Коммент {i}')
+            for i in range(cls.POSTS)
+        )
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testAuthorized')
+        Follow.objects.create(user=self.user, author=QueryBudgetTests.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_views_within_query_budget(self):
+        """Проверяем, что число запросов не зависит от числа постов
+        и комментариев на странице."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={
+                'slug': QueryBudgetTests.group.slug
+            }),
+            reverse('posts:profile', kwargs={
+                'username': QueryBudgetTests.author.username
+            }),
+            reverse('posts:post_detail', kwargs={
+                'post_id': QueryBudgetTests.post.pk
+            }),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(self.authorized_client, url)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group
+        )
+        self.urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:profile', kwargs={'username': 'testAuthor'}),
+            reverse('posts:group_posts', kwargs={'slug': 'test'}),
+        )
+
+    def revalidate(self, url, response):
+        return self.guest_client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_unchanged_page_is_not_modified(self):
+        """Неизмененная страница отвечает 304 одним запросом к базе."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                with self.assertNumQueries(1):
+                    response = self.revalidate(url, response)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_changes_invalidate_validators(self):
+        """Правка, комментарий и удаление записи меняют валидаторы."""
+        def touch_post():
+            self.post.text = 'Исправленный пост'
+            self.post.save()
+
+        def add_comment():
+            Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'
+            )
+
+        def delete_post():
+            Post.objects.create(
+                author=self.author, text='Старый пост', group=self.group
+            )
+            responses = {url: self.guest_client.get(url) for url in urls}
+            Post.objects.filter(text='Старый пост').delete()
+            return responses
+
+        urls = self.urls[1:]
+        for change in (touch_post, add_comment):
+            with self.subTest(change=change.__name__):
+                responses = {
+                    url: self.guest_client.get(url) for url in self.urls
+                }
+                change()
+                for url, response in responses.items():
+                    self.assertEqual(
+                        self.revalidate(url, response).status_code,
+                        HTTPStatus.OK
+                    )
+        for url, response in delete_post().items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(url, response).status_code, HTTPStatus.OK
+                )
+
+    def test_counters_invalidate_validators(self):
+        """Новая подписка меняет валидаторы профиля, новая запись
+        автора - валидаторы страницы записи."""
+        follower = User.objects.create_user(username='testFollower')
+        changes = (
+            (self.urls[1], lambda: Follow.objects.create(
+                user=follower, author=self.author
+            )),
+            (self.urls[0], lambda: Post.objects.create(
+                author=self.author, text='Еще пост'
+            )),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                change()
+                self.assertEqual(
+                    self.revalidate(url, response).status_code,
+                    HTTPStatus.OK
+                )
+
+    def test_renames_invalidate_validators(self):
+        """Новое описание группы и новое имя автора меняют валидаторы
+        страниц, где они видны."""
+        def describe_group():
+            self.group.description = 'Новое описание'
+            self.group.save()
+
+        def rename_author():
+            self.author.first_name = 'Новое имя'
+            self.author.save()
+
+        for change in (describe_group, rename_author):
+            with self.subTest(change=change.__name__):
+                responses = {
+                    url: self.guest_client.get(url) for url in self.urls
+                }
+                change()
+                for url, response in responses.items():
+                    self.assertEqual(
+                        self.revalidate(url, response).status_code,
+                        HTTPStatus.OK
+                    )
+
+    def test_authorized_pages_are_not_conditional(self):
+        """Страницы для вошедшего пользователя отдаются без валидаторов."""
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(self.urls[0])
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.COMMENTS = settings.COMMENTS_PER_PAGE + 5
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Коммент {i}')
+            for i in range(cls.COMMENTS)
+        )
+        cls.POST_DETAIL_URL = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+        cls.COMMENTS_URL = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        """На странице записи только первая страница комментариев."""
+        response = self.guest_client.get(self.POST_DETAIL_URL)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, self.COMMENTS_URL)
+
+    def test_fragment_returns_next_batch(self):
+        """Фрагмент отдает следующую пачку одним запросом к базе."""
+        cursor = self.guest_client.get(
+            self.POST_DETAIL_URL
+        ).context['comments'].next_cursor
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                self.COMMENTS_URL, {'comments': cursor}
+            )
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertNotContains(response, 'Показать еще')
+
+
+class PostDetailCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='testAuthor')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        cache.clear()
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def test_hot_post_is_served_from_cache(self):
+        """Повторный просмотр записи стоит одного запроса к базе."""
+        self.guest_client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(self.url)
+        self.assertEqual(response.context['post'], self.post)
+
+    def test_edit_comment_and_delete_invalidate_cache(self):
+        """Правка, комментарий и удаление сбрасывают кеш записи."""
+        self.guest_client.get(self.url)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный пост'},
+        )
+        self.assertContains(self.guest_client.get(self.url), 'Исправленный')
+        self.author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Новый комментарий'},
+        )
+        self.assertContains(
+            self.guest_client.get(self.url), 'Новый комментарий'
+        )
+        self.post.delete()
+        self.assertEqual(
+            self.guest_client.get(self.url).status_code,
+            HTTPStatus.NOT_FOUND
+        )
+
+    def test_other_author_posts_update_counter(self):
+        """Новая запись автора меняет его счетчик на странице
+        закешированной записи."""
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response.context['post'].author.stats.posts_count, 1)
+        Post.objects.create(author=self.author, text='Еще пост')
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response.context['post'].author.stats.posts_count, 2)
@@ -0,0 +1,258 @@
+import functools
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections, transaction
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDbKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+_pending = set()
+_executor = None
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который не рендерит миниатюры внутри запроса.
+
+    В запросе отдается только готовая миниатюра из KV-хранилища.
+    Отсутствующая ставится в очередь воркеров, а шаблон показывает
+    оригинал через ветку ``{% empty %}``.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if getattr(_local, 'rendering', False):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        thumbnail = self.lookup(file_, geometry_string, **options)
+        if thumbnail is None:
+            enqueue_missing(str(file_))
+        return thumbnail
+
+    def lookup(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None, без обращения к движку."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, options)
+        )
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        """ImageFile, под которым sorl хранит миниатюру."""
+        source = ImageFile(file_)
+        options = self.get_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_options(self, source, options):
+        """Опции с умолчаниями, как их дополняет ``get_thumbnail``."""
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
+
+
+def _get_many(keys):
+    """Читает записи KV-хранилища пачкой: один get_many кеша
+    и не больше одного запроса к базе на промахи."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDbKVStore):
+        return {key: kvstore._get(key) for key in keys}
+    raw_keys = {add_prefix(key): key for key in keys}
+    values = kvstore.cache.get_many(list(raw_keys))
+    missing = [raw for raw in raw_keys if raw not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        kvstore.cache.set_many(
+            {raw: found.get(raw, EMPTY_VALUE) for raw in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        values.update(found)
+    return {
+        raw_keys[raw]: deserialize_image_file(value)
+        for raw, value in values.items()
+        if value and value != EMPTY_VALUE
+    }
+
+
+@functools.lru_cache()
+def srcset_format():
+    """WebP, если Pillow собран с его поддержкой, иначе JPEG."""
+    return 'WEBP' if features.check('webp') else 'JPEG'
+
+
+def srcset_geometries():
+    """Варианты миниатюры для srcset: ширины THUMBNAIL_SRCSET_WIDTHS
+    с пропорциями и опциями первой из THUMBNAIL_GEOMETRIES."""
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+    width, height = map(int, geometry.split('x'))
+    options = dict(options, format=srcset_format())
+    return [
+        (f'{size}x{round(height * size / width)}', options)
+        for size in settings.THUMBNAIL_SRCSET_WIDTHS
+    ]
+
+
+def prefetch(posts):
+    """Разрешает миниатюры страницы постов одним проходом.
+
+    Каждому посту проставляется ``post.thumbnail``: готовый ImageFile
+    с url и размерами или None, а также ``post.thumbnail_srcset`` для
+    готовых вариантов из srcset_geometries и их MIME-тип
+    ``post.thumbnail_type``. Недостающие миниатюры ставятся в очередь
+    на рендер.
+    """
+    geometries = [settings.THUMBNAIL_GEOMETRIES[0], *srcset_geometries()]
+    content_type = f'image/{srcset_format().lower()}'
+    files = {}
+    for post in posts:
+        post.thumbnail = None
+        post.thumbnail_srcset = ''
+        post.thumbnail_type = content_type
+        if post.image:
+            files[post] = [
+                default.backend.thumbnail_file(
+                    post.image.name, geometry, options
+                )
+                for geometry, options in geometries
+            ]
+    if not files:
+        return posts
+    found = _get_many([
+        file.key for post_files in files.values() for file in post_files
+    ])
+    for post, (base, *sources) in files.items():
+        post.thumbnail = found.get(base.key)
+        ready = [found[file.key] for file in sources if file.key in found]
+        post.thumbnail_srcset = ', '.join(
+            f'{file.url} {file.width}w' for file in ready
+        )
+        if post.thumbnail is None or len(ready) < len(sources):
+            enqueue_missing(post.image.name)
+    return posts
+
+
+def render(name):
+    """Рендерит все миниатюры THUMBNAIL_GEOMETRIES и варианты
+    для srcset."""
+    _local.rendering = True
+    try:
+        geometries = [*settings.THUMBNAIL_GEOMETRIES, *srcset_geometries()]
+        for geometry, options in geometries:
+            default.backend.get_thumbnail(name, geometry, **options)
+    finally:
+        _local.rendering = False
+
+
+def _failure_key(name):
+    return f'thumbnails:failed:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def _render_or_remember(name):
+    """Рендерит миниатюры и запоминает неудачу на
+    THUMBNAIL_FAILURE_TIMEOUT секунд.
+
+    sorl не пробрасывает ошибки чтения исходника, поэтому неудачей
+    считается и отсутствие основной миниатюры после рендера.
+    """
+    try:
+        render(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[0]
+    if default.backend.lookup(name, geometry, **options) is None:
+        cache.set(
+            _failure_key(name), True, settings.THUMBNAIL_FAILURE_TIMEOUT
+        )
+    else:
+        cache.delete(_failure_key(name))
+
+
+def _work(name):
+    try:
+        _render_or_remember(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+        connections.close_all()
+
+
+def _submit(name):
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    _executor.submit(_work, name)
+
+
+def enqueue(name):
+    """Ставит картинку в очередь на рендер миниатюр после коммита.
+
+    При THUMBNAIL_WORKERS = 0 миниатюры рендерятся сразу.
+    """
+    if not name:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        _render_or_remember(name)
+        return
+    transaction.on_commit(lambda: _submit(name))
+
+
+def enqueue_missing(name):
+    """Как enqueue, но пропускает картинки, рендер которых недавно
+    не удался: битый или пропавший файл не рендерится на каждом
+    просмотре страницы."""
+    if name and cache.get(_failure_key(name)) is None:
+        enqueue(name)
+
+
+def wait():
+    """Ждет, пока воркеры дорендерят все поставленные миниатюры.
+
+    Нужно, например, перед удалением временного MEDIA_ROOT в тестах.
+    """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def delete(name):
+    """Удаляет картинку, ее миниатюры и их записи в KV-хранилище.
+
+    Ошибка удаления только пишется в лог: запись, из-за которой файл
+    освободился, уже сохранена.
+    """
+    try:
+        delete_with_thumbnails(name)
+    except (OSError, SuspiciousFileOperation):
+        logger.exception('Не удалось удалить картинку %s', name)
@@ -13,6 +13,12 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
@@ -1,49 +1,147 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.decorators import conditional_page, query_budget
+
+from . import search as post_search
+from . import resolvers, thumbnails
+from .cache import NAMES_FEED, feed_data, feed_page, version
+from .feeds import follow_feed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Post, User, UserStats
+from .paginators import CursorPaginator
+
+
+def paginate(request, paginator, feed=None):
+    cursor = request.GET.get('cursor')
+    number = request.GET.get('page')
+    if feed is None:
+        page = paginator.cursor_page(cursor, number)
+    else:
+        page = feed_page(feed, paginator, cursor, number)
+    thumbnails.prefetch(page.object_list)
+    return page
+
+
+def paginator(request, post_list, feed=None):
+    return paginate(
+        request, CursorPaginator(post_list, settings.POSTS_PER_PAGE), feed
+    )
+
+
+def feed_state(post_list):
+    """Последнее изменение и число записей ленты одним запросом.
 
+    В отпечаток входит версия NAMES_FEED: переименование группы или
+    автора не меняет записей, но видно на странице.
+    """
+    state = post_list.aggregate(updated=Max('updated'), total=Count('pk'))
+    return state['updated'], (state['total'], version(NAMES_FEED))
 
-def paginator(request, post_list):
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
 
+def group_state(request, slug):
+    return feed_state(Post.objects.filter(group__slug=slug))
 
+
+def profile_state(request, username):
+    """Состояние ленты автора вместе с его счетчиками подписок:
+    подписка не меняет ни одной записи, но видна на странице."""
+    state = User.objects.filter(username=username).values(
+        'stats__followers_count', 'stats__following_count'
+    ).annotate(updated=Max('posts__updated'), total=Count('posts')).first()
+    if state is None:
+        return None
+    return state.pop('updated'), (
+        sorted(state.items()), version(NAMES_FEED)
+    )
+
+
+def post_state(request, post_id):
+    """Дата изменения записи, которую двигают и новые комментарии,
+    и число записей автора со страницы записи."""
+    state = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__stats__posts_count'
+    ).first()
+    if state is None:
+        return None
+    updated, posts_count = state
+    return updated, (posts_count, version(NAMES_FEED))
+
+
+@query_budget(4)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     context = {
-        'page_obj': paginator(request, post_list),
+        'page_obj': paginator(request, post_list, 'index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(5)
+@conditional_page(group_state)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    group = resolvers.groups.get_or_404(slug)
+    post_list = group.posts.select_related('author', 'group')
     context = {
         'group': group,
-        'page_obj': paginator(request, post_list),
+        'page_obj': paginator(request, post_list, f'group:{group.pk}'),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(5)
+@conditional_page(profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
+    author = resolvers.users.get_or_404(username)
+    post_list = author.posts.select_related('author', 'group')
     context = {
         'author': author,
-        'page_obj': paginator(request, post_list),
+        'page_obj': paginator(request, post_list, f'profile:{author.pk}'),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def comments_paginator(post_id):
+    """Комментарии записи по курсору вместе с авторами."""
+    return CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+    )
+
+
+def load_post_detail(post_id):
+    """Запись с автором, группой и первой страницей комментариев
+    в виде, пригодном для кеша."""
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    paginator = comments_paginator(post_id)
+    return post, paginator.dump(paginator.cursor_page())
+
+
+@query_budget(5)
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post, first_comments = feed_data(
+        f'post:{post_id}', 'detail', lambda: load_post_detail(post_id)
+    )
+    # Счетчики автора меняют и другие его записи, поэтому они кешируются
+    # под версией профиля, а не записи.
+    post.author.stats = feed_data(
+        f'profile:{post.author_id}', 'stats',
+        lambda: UserStats.objects.filter(user_id=post.author_id).first()
+    )
+    thumbnails.prefetch([post])
+    cursor = request.GET.get('comments')
+    paginator = comments_paginator(post_id)
+    if cursor:
+        comments = paginator.cursor_page(cursor)
+    else:
+        comments = paginator.load(first_comments)
     form = CommentForm()
-    comments = post.comments.all()
     context = {
         'post': post,
         'form': form,
@@ -52,6 +150,32 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(4)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(
+        post_search.search(query), settings.POSTS_PER_PAGE
+    ).get_page(request.GET.get('page'))
+    thumbnails.prefetch(page_obj.object_list)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(1)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев."""
+    context = {
+        'post_id': post_id,
+        'comments': comments_paginator(post_id).cursor_page(
+            request.GET.get('comments')
+        ),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -60,6 +184,8 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    if post.image:
+        thumbnails.enqueue(post.image.name)
     return redirect('posts:profile', username=post.author)
 
 
@@ -84,7 +210,9 @@ def post_edit(request, post_id):
         }
         return render(request, 'posts/create_post.html', context)
 
-    form.save()
+    post = form.save()
+    if post.image and 'image' in form.changed_data:
+        thumbnails.enqueue(post.image.name)
 
     return redirect('posts:post_detail', post_id=post_id)
 
@@ -102,17 +230,18 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(5)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    feed = follow_feed(request.user, settings.POSTS_PER_PAGE)
     context = {
-        'page_obj': paginator(request, post_list),
+        'page_obj': paginate(request, feed),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = resolvers.users.get_or_404(username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
@@ -120,6 +249,6 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = resolvers.users.get_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
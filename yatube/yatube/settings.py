@@ -17,6 +17,7 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'sorl.thumbnail',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
@@ -29,7 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,6 +71,34 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения (core.db.PrimaryReplicaRouter). Локально
+# YATUBE_REPLICA=1 добавляет копию db_replica.sqlite3, которую
+# обновляет команда sync_replica. Тесты запускаются без реплик.
+DATABASE_REPLICAS = []
+if os.environ.get('YATUBE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+
+# Сколько секунд после записи чтения пользователя идут на основную
+# базу; должно покрывать отставание реплик.
+REPLICA_STICKY_SECONDS = 10
+
+# PRAGMA для каждого нового соединения SQLite (core.db). В режиме WAL
+# читатели не ждут писателя, а писатель ждет освобождения базы до
+# busy_timeout миллисекунд вместо ошибки database is locked.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'busy_timeout': 5000,
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,14 +137,99 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Версии лент (posts.cache) хранятся в кеше, поэтому он должен быть
+# общим для всех воркеров: YATUBE_MEMCACHED задает адрес memcached,
+# YATUBE_CACHE_DIR - каталог FileBasedCache. Без них у каждого процесса
+# свой LocMemCache, правка в одном воркере не сбрасывает страницы
+# в других, и страницы кешируются не дольше 20 секунд.
+if os.environ.get('YATUBE_MEMCACHED'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['YATUBE_MEMCACHED'],
+    }}
+elif os.environ.get('YATUBE_CACHE_DIR'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['YATUBE_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }}
+else:
+    CACHES = {'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    }}
+SHARED_CACHE = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+
+# Авторы с таким числом подписчиков не раскладываются по лентам,
+# а подмешиваются в ленту подписок при чтении.
+FEED_CELEBRITY_FOLLOWERS = 10000
+
+# Время жизни закешированных страниц лент, секунды. Страницы
+# инвалидируются сигналами при изменении постов и комментариев,
+# но только в общем кеше (SHARED_CACHE).
+FEED_CACHE_TIMEOUT = 300 if SHARED_CACHE else 20
+
+# Загруженные картинки уменьшаются до IMAGE_MAX_SIZE пикселей
+# по большей стороне и пересжимаются с качеством IMAGE_QUALITY без
+# метаданных (posts.images). Картинки больше IMAGE_MAX_PIXELS
+# отклоняются формой.
+IMAGE_MAX_SIZE = 2048
+IMAGE_QUALITY = 85
+IMAGE_MAX_PIXELS = 50_000_000
+
+# Миниатюры рендерятся воркерами при загрузке картинки, а не первым
+# читателем. THUMBNAIL_GEOMETRIES должны совпадать с {% thumbnail %}
+# в шаблонах; при THUMBNAIL_WORKERS = 0 рендер идет синхронно.
+# Первая геометрия нарезается еще и по ширинам THUMBNAIL_SRCSET_WIDTHS
+# в WebP (JPEG, если Pillow собран без WebP) для <picture srcset>.
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+THUMBNAIL_SRCSET_WIDTHS = (320, 640, 960)
+THUMBNAIL_WORKERS = 2
+# Сколько секунд не повторять рендер картинки, миниатюры которой
+# не удалось создать.
+THUMBNAIL_FAILURE_TIMEOUT = 3600
+
+# Бэкенд полнотекстового поиска: 'fts5' или 'python'. None выбирает
+# FTS5, если миграция смогла создать таблицу, иначе обратный индекс.
+SEARCH_BACKEND = None
+
+# LRU в памяти процесса для групп по slug и пользователей по username.
+# Записи сбрасываются сигналами через версию в кеше и живут не дольше
+# RESOLVER_CACHE_TTL секунд; без общего кеша других воркеров сброс
+# не достигает, и срок такой же, как у страниц лент.
+RESOLVER_CACHE_SIZE = 1024
+RESOLVER_CACHE_TTL = 60 if SHARED_CACHE else FEED_CACHE_TIMEOUT
+
+# Доля запросов, для которых PerformanceMiddleware отдает Server-Timing
+# и пишет замеры в логгер core.performance. По умолчанию замеры
+# выключены, в том числе в тестах; включаются переменной окружения
+# YATUBE_PERFORMANCE_SAMPLE_RATE, например 0.1.
+PERFORMANCE_SAMPLE_RATE = float(
+    os.environ.get('YATUBE_PERFORMANCE_SAMPLE_RATE', 0)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
 }